@@ -29,10 +29,15 @@ import argparse
 import collections
 import contextlib
 import errno
+import hashlib
+import multiprocessing
+import multiprocessing.pool
 import os
 import re
+import shutil
 import subprocess
 import sys
+import tempfile
 
 usage = 'git clang-format [OPTIONS] [<commit>] [<commit>] [--] [<file>...]'
 
@@ -55,6 +60,9 @@ The following git-config settings set the default of the corresponding option:
 # This file is created within the .git directory.
 temp_index_basename = 'clang-format-index'
 
+# Name of the directory caching clang-format results, within the .git directory.
+cache_basename = 'clang-format-cache'
+
 
 Range = collections.namedtuple('Range', 'start, count')
 
@@ -107,6 +115,17 @@ def main():
                        'excluding the period and case-insensitive')),
   p.add_argument('-f', '--force', action='store_true',
                  help='allow changes to unstaged files')
+  p.add_argument('--no-cache', dest='cache', action='store_false',
+                 help='always run clang-format instead of reusing results '
+                      'cached in .git/%s' % cache_basename)
+  p.add_argument('--cache-entries', type=int,
+                 default=int(config.get('clangformat.cacheentries', 10000)),
+                 help='max number of cached results, least recently used '
+                      'are evicted (default: 10000)')
+  p.add_argument('-j', '--jobs', type=int,
+                 default=multiprocessing.cpu_count(),
+                 help='number of files formatted in parallel '
+                      '(default: number of CPUs)')
   p.add_argument('-p', '--patch', action='store_true',
                  help='select hunks interactively')
   p.add_argument('-q', '--quiet', action='count', default=0,
@@ -157,17 +176,26 @@ def main():
   # The computed diff outputs absolute paths, so we must cd before accessing
   # those files.
   cd_to_toplevel()
+  cache = None
+  if opts.cache:
+    cache = FormatCache(os.path.join(run('git', 'rev-parse', '--git-dir'),
+                                     cache_basename),
+                        max_entries=opts.cache_entries)
   if len(commits) > 1:
     old_tree = commits[1]
     new_tree = run_clang_format_and_save_to_tree(changed_lines,
                                                  revision=commits[1],
                                                  binary=opts.binary,
-                                                 style=opts.style)
+                                                 style=opts.style,
+                                                 jobs=opts.jobs,
+                                                 cache=cache)
   else:
     old_tree = create_tree_from_workdir(changed_lines)
     new_tree = run_clang_format_and_save_to_tree(changed_lines,
                                                  binary=opts.binary,
-                                                 style=opts.style)
+                                                 style=opts.style,
+                                                 jobs=opts.jobs,
+                                                 cache=cache)
   if opts.verbose >= 1:
     print('old tree: %s' % old_tree)
     print('new tree: %s' % new_tree)
@@ -351,36 +379,360 @@ def create_tree_from_workdir(filenames):
 
 
 def run_clang_format_and_save_to_tree(changed_lines, revision=None,
-                                      binary='clang-format', style=None):
+                                      binary='clang-format', style=None,
+                                      jobs=1, cache=None):
   """Run clang-format on each file and save the result to a git tree.
 
+  Up to `jobs` files are formatted at the same time; the tree is assembled in
+  the order of `changed_lines` regardless.  Git is run a fixed number of times,
+  not once per file: one `ls-tree -r` for the modes and one `cat-file --batch`
+  for the contents in `revision`, and one `hash-object --stdin-paths` for the
+  formatted blobs.  Files whose result is in `cache` (a FormatCache) are not
+  formatted again.
+
   Returns the object ID (SHA-1) of the created tree."""
   def iteritems(container):
       try:
           return container.iteritems() # Python 2
       except AttributeError:
           return container.items() # Python 3
-  def index_info_generator():
-    for filename, line_ranges in iteritems(changed_lines):
-      if revision:
-        git_metadata_cmd = ['git', 'ls-tree',
-                            '%s:%s' % (revision, os.path.dirname(filename)),
-                            os.path.basename(filename)]
-        git_metadata = subprocess.Popen(git_metadata_cmd, stdin=subprocess.PIPE,
-                                        stdout=subprocess.PIPE)
-        stdout = git_metadata.communicate()[0]
-        mode = oct(int(stdout.split()[0], 8))
-      else:
-        mode = oct(os.stat(filename).st_mode)
+  items = list(iteritems(changed_lines))
+  filenames = [filename for filename, _ in items]
+  if revision:
+    entries = get_tree_entries(revision, filenames)
+    modes = dict((f, entry[0]) for f, entry in entries.items())
+    input_ids = [entries[filename][1] for filename in filenames]
+  else:
+    modes = {}
+    for filename in filenames:
+      mode = oct(os.stat(filename).st_mode)
       # Adjust python3 octal format so that it matches what git expects
       if mode.startswith('0o'):
           mode = '0' + mode[2:]
-      blob_id = clang_format_to_blob(filename, line_ranges,
-                                     revision=revision,
-                                     binary=binary,
-                                     style=style)
-      yield '%s %s\t%s' % (mode, blob_id, filename)
-  return create_tree(index_info_generator(), '--index-info')
+      modes[filename] = mode
+    input_ids = hash_files(filenames) if cache is not None else None
+
+  blob_ids = [None] * len(items)
+  if cache is not None:
+    version = clang_format_version(binary)
+    keys = [cache.key(filename, input_ids[i], line_ranges, style,
+                      style_config_id(filename, style), version)
+            for i, (filename, line_ranges) in enumerate(items)]
+    blob_ids = cache.lookup(keys)
+  todo = [i for i in range(len(items)) if blob_ids[i] is None]
+  if not todo:
+    return create_tree(['%s %s\t%s' % (modes[filename], blob_id, filename)
+                        for filename, blob_id in zip(filenames, blob_ids)],
+                       '--index-info')
+
+  contents = [None] * len(items)
+  if revision:
+    with CatFileBatch() as cat_file:
+      for i in todo:
+        contents[i] = cat_file.read(input_ids[i])
+
+  def format_file(index):
+    filename, line_ranges = items[index]
+    return run_clang_format(filename, line_ranges, content=contents[index],
+                            binary=binary, style=style)
+  if jobs is None or jobs < 1:
+    jobs = multiprocessing.cpu_count()
+  jobs = min(jobs, len(todo))
+  if jobs <= 1:
+    outputs = [format_file(index) for index in todo]
+  else:
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+      outputs = pool.map(_ExitCatcher(format_file), todo)
+    finally:
+      pool.close()
+      pool.join()
+    for output in outputs:
+      if isinstance(output, _WorkerExit):
+        # die() already printed the message in the worker.
+        sys.exit(output.code)
+  new_ids = hash_blobs([filenames[i] for i in todo], outputs)
+  for i, blob_id in zip(todo, new_ids):
+    blob_ids[i] = blob_id
+  if cache is not None:
+    cache.store([keys[i] for i in todo], new_ids)
+    # Evict after storing, so the cache never stays above max_entries.
+    cache.evict()
+  return create_tree(['%s %s\t%s' % (modes[filename], blob_id, filename)
+                      for filename, blob_id in zip(filenames, blob_ids)],
+                     '--index-info')
+
+
+def get_tree_entries(revision, filenames):
+  """Return {filename: (mode, object ID)} of `filenames` in `revision`.
+
+  Uses one ls-tree for all files."""
+  output = run('git', 'ls-tree', '-r', '-z', '--full-name', revision, '--',
+               *filenames, strip=False)
+  entries = {}
+  for entry in output.split('\0'):
+    if not entry:
+      continue
+    metadata, filename = entry.split('\t', 1)
+    mode, _, object_id = metadata.split()
+    entries[filename] = (mode, object_id)
+  missing = [filename for filename in filenames if filename not in entries]
+  if missing:
+    die('cannot find %s in %s' % (', '.join(missing), revision))
+  return entries
+
+
+def hash_files(filenames):
+  """Return the object IDs of the working directory files as they are on disk.
+
+  Uses one `hash-object --stdin-paths` for all files, without writing them."""
+  output = run('git', 'hash-object', '--no-filters', '--stdin-paths',
+               stdin=to_bytes(''.join(f + '\n' for f in filenames)))
+  return output.split()
+
+
+def clang_format_version(binary):
+  """Return the output of `<binary> --version`."""
+  try:
+    return run(binary, '--version')
+  except OSError as e:
+    if e.errno == errno.ENOENT:
+      die('cannot find executable "%s"' % binary)
+    raise
+
+
+_style_config_ids = {}
+
+
+def style_config_id(filename, style):
+  """Return an ID of the .clang-format file clang-format uses for `filename`.
+
+  clang-format reads the nearest .clang-format or _clang-format above the file
+  for the default and "file" styles, "file:<path>" names it explicitly; other
+  styles do not depend on the file system."""
+  if style and style.startswith('file:'):
+    with open(style[len('file:'):], 'rb') as f:
+      return hashlib.sha1(f.read()).hexdigest()
+  if style and style != 'file':
+    return ''
+  directory = os.path.dirname(filename)
+  if directory in _style_config_ids:
+    return _style_config_ids[directory]
+  config_id = ''
+  current = os.path.abspath(directory)
+  while True:
+    for name in ('.clang-format', '_clang-format'):
+      path = os.path.join(current, name)
+      if os.path.isfile(path):
+        with open(path, 'rb') as f:
+          config_id = '%s:%s' % (path, hashlib.sha1(f.read()).hexdigest())
+        break
+    parent = os.path.dirname(current)
+    if config_id or parent == current:
+      break
+    current = parent
+  _style_config_ids[directory] = config_id
+  return config_id
+
+
+class FormatCache(object):
+  """On-disk map from clang-format inputs to the object ID of the result.
+
+  One file per key, named after the key and holding the output blob ID; its
+  mtime is the last use, so that the least recently used entries are evicted
+  beyond `max_entries`.  Hits whose blob was pruned by `git gc` are misses."""
+
+  def __init__(self, directory, max_entries=10000):
+    self.directory = directory
+    self.max_entries = max_entries
+    if not os.path.isdir(directory):
+      os.makedirs(directory)
+
+  def key(self, filename, input_id, line_ranges, style, config_id, version):
+    """Return the key of formatting `line_ranges` of blob `input_id`.
+
+    The path is part of the key: clang-format picks the language from the file
+    name, and the output blob is converted with the attributes of the path."""
+    ranges = ','.join('%d+%d' % (start, count) for start, count in line_ranges)
+    fields = [filename, input_id, ranges, style or '', config_id, version]
+    return hashlib.sha1(to_bytes('\0'.join(fields))).hexdigest()
+
+  def path(self, key):
+    return os.path.join(self.directory, key)
+
+  def lookup(self, keys):
+    """Return the cached object IDs of `keys`, None for misses."""
+    blob_ids = []
+    for key in keys:
+      try:
+        with open(self.path(key)) as f:
+          blob_ids.append(f.read().strip() or None)
+      except (IOError, OSError):
+        blob_ids.append(None)
+    hits = [blob_id for blob_id in blob_ids if blob_id]
+    if hits:
+      output = run('git', 'cat-file',
+                   '--batch-check=%(objectname) %(objecttype)',
+                   stdin=to_bytes(''.join(b + '\n' for b in hits)))
+      existing = set(line.split()[0] for line in output.splitlines()
+                     if line.endswith(' blob'))
+      blob_ids = [b if b in existing else None for b in blob_ids]
+    for key, blob_id in zip(keys, blob_ids):
+      if blob_id:
+        try:
+          os.utime(self.path(key), None)
+        except OSError:
+          pass
+    return blob_ids
+
+  def store(self, keys, blob_ids):
+    for key, blob_id in zip(keys, blob_ids):
+      temp_path = '%s.%d.tmp' % (self.path(key), os.getpid())
+      try:
+        with open(temp_path, 'w') as f:
+          f.write(blob_id + '\n')
+        os.rename(temp_path, self.path(key))
+      except (IOError, OSError):
+        pass
+
+  def evict(self):
+    """Remove the least recently used entries beyond `max_entries`."""
+    try:
+      names = os.listdir(self.directory)
+    except OSError:
+      return
+    if len(names) <= self.max_entries:
+      return
+    entries = []
+    for name in names:
+      try:
+        entries.append((os.stat(self.path(name)).st_mtime, name))
+      except OSError:
+        pass
+    entries.sort()
+    for _, name in entries[:len(entries) - self.max_entries]:
+      try:
+        os.remove(self.path(name))
+      except OSError:
+        pass
+
+
+class CatFileBatch(object):
+  """One long-lived `git cat-file --batch` process, reading object by object."""
+
+  def __init__(self):
+    self.process = subprocess.Popen(['git', 'cat-file', '--batch'],
+                                    stdin=subprocess.PIPE,
+                                    stdout=subprocess.PIPE)
+
+  def read(self, object_name):
+    """Return the content of `object_name`, e.g. "<revision>:<path>"."""
+    self.process.stdin.write(to_bytes(object_name + '\n'))
+    self.process.stdin.flush()
+    header = self.process.stdout.readline()
+    fields = header.split()
+    if len(fields) != 3:
+      die('`git cat-file --batch` cannot read %s: %s'
+          % (object_name, convert_string(header).strip()))
+    content = self.process.stdout.read(int(fields[2]))
+    self.process.stdout.read(1)  # the newline after the content
+    return content
+
+  def close(self):
+    self.process.stdin.close()
+    self.process.stdout.close()
+    self.process.wait()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+
+def needs_filters(filenames):
+  """Return the set of `filenames` whose attributes rewrite content on add.
+
+  Uses one `git check-attr` for all files.  Only a filter driver, ident or a
+  working-tree-encoding can change content without carriage returns; the eol
+  and text attributes (`* text eol=lf` here) only convert CRLF."""
+  output = run('git', 'check-attr', '-z', '--stdin', 'filter', 'ident',
+               'working-tree-encoding',
+               stdin=to_bytes(''.join(f + '\0' for f in filenames)),
+               strip=False)
+  fields = output.split('\0')
+  filtered = set()
+  for i in range(0, len(fields) - 2, 3):
+    filename, value = fields[i], fields[i + 2]
+    if value not in ('unspecified', 'unset'):
+      filtered.add(filename)
+  return filtered
+
+
+def hash_blobs(filenames, contents):
+  """Write `contents` as blobs, converted as if added at `filenames`.
+
+  Contents that git would store unchanged go through a single
+  `git hash-object -w --no-filters --stdin-paths`; git cannot combine
+  --stdin-paths with --path, so the rest use one `hash-object --path` each.
+
+  Returns the object IDs (SHA-1) in the order of `filenames`."""
+  blob_ids = [None] * len(filenames)
+  filtered = needs_filters(filenames)
+  batched = []
+  for index, (filename, content) in enumerate(zip(filenames, contents)):
+    if filename in filtered or b'\r' in content:
+      blob_ids[index] = hash_blob(filename, content)
+    else:
+      batched.append(index)
+  if not batched:
+    return blob_ids
+  temp_dir = tempfile.mkdtemp(prefix='git-clang-format-')
+  try:
+    paths = []
+    for index in batched:
+      path = os.path.join(temp_dir, str(index))
+      with open(path, 'wb') as f:
+        f.write(contents[index])
+      paths.append(path)
+    output = run('git', 'hash-object', '-w', '--no-filters', '--stdin-paths',
+                 stdin=to_bytes(''.join(path + '\n' for path in paths)))
+  finally:
+    shutil.rmtree(temp_dir, ignore_errors=True)
+  for index, blob_id in zip(batched, output.split()):
+    blob_ids[index] = blob_id
+  return blob_ids
+
+
+def hash_blob(filename, content):
+  """Write `content` as a blob, converted as if it was added at `filename`."""
+  hash_object_cmd = ['git', 'hash-object', '-w', '--path='+filename, '--stdin']
+  hash_object = subprocess.Popen(hash_object_cmd, stdin=subprocess.PIPE,
+                                 stdout=subprocess.PIPE)
+  stdout = hash_object.communicate(content)[0]
+  if hash_object.returncode != 0:
+    die('`%s` failed' % ' '.join(hash_object_cmd))
+  return convert_string(stdout).rstrip('\r\n')
+
+
+class _WorkerExit(object):
+  """The SystemExit of a pool worker (e.g. from die()) passed back as value."""
+
+  def __init__(self, code):
+    self.code = code
+
+
+class _ExitCatcher(object):
+  """Wrap `func` so that SystemExit does not kill the pool's worker thread."""
+
+  def __init__(self, func):
+    self.func = func
+
+  def __call__(self, *args):
+    try:
+      return self.func(*args)
+    except SystemExit as e:
+      return _WorkerExit(e.code)
 
 
 def create_tree(input_lines, mode):
@@ -403,54 +755,33 @@ def create_tree(input_lines, mode):
     return tree_id
 
 
-def clang_format_to_blob(filename, line_ranges, revision=None,
-                         binary='clang-format', style=None):
-  """Run clang-format on the given file and save the result to a git blob.
-
-  Runs on the file in `revision` if not None, or on the file in the working
-  directory if `revision` is None.
+def run_clang_format(filename, line_ranges, content=None,
+                     binary='clang-format', style=None):
+  """Run clang-format on `content`, or on the working directory file if None.
 
-  Returns the object ID (SHA-1) of the created blob."""
+  Returns the formatted content as bytes."""
   clang_format_cmd = [binary]
   if style:
     clang_format_cmd.extend(['-style='+style])
   clang_format_cmd.extend([
       '-lines=%s:%s' % (start_line, start_line+line_count-1)
       for start_line, line_count in line_ranges])
-  if revision:
+  if content is not None:
     clang_format_cmd.extend(['-assume-filename='+filename])
-    git_show_cmd = ['git', 'cat-file', 'blob', '%s:%s' % (revision, filename)]
-    git_show = subprocess.Popen(git_show_cmd, stdin=subprocess.PIPE,
-                                stdout=subprocess.PIPE)
-    git_show.stdin.close()
-    clang_format_stdin = git_show.stdout
   else:
     clang_format_cmd.extend([filename])
-    git_show = None
-    clang_format_stdin = subprocess.PIPE
   try:
-    clang_format = subprocess.Popen(clang_format_cmd, stdin=clang_format_stdin,
+    clang_format = subprocess.Popen(clang_format_cmd, stdin=subprocess.PIPE,
                                     stdout=subprocess.PIPE)
-    if clang_format_stdin == subprocess.PIPE:
-      clang_format_stdin = clang_format.stdin
   except OSError as e:
     if e.errno == errno.ENOENT:
       die('cannot find executable "%s"' % binary)
     else:
       raise
-  clang_format_stdin.close()
-  hash_object_cmd = ['git', 'hash-object', '-w', '--path='+filename, '--stdin']
-  hash_object = subprocess.Popen(hash_object_cmd, stdin=clang_format.stdout,
-                                 stdout=subprocess.PIPE)
-  clang_format.stdout.close()
-  stdout = hash_object.communicate()[0]
-  if hash_object.returncode != 0:
-    die('`%s` failed' % ' '.join(hash_object_cmd))
-  if clang_format.wait() != 0:
+  stdout = clang_format.communicate(content if content is not None else b'')[0]
+  if clang_format.returncode != 0:
     die('`%s` failed' % ' '.join(clang_format_cmd))
-  if git_show and git_show.wait() != 0:
-    die('`%s` failed' % ' '.join(git_show_cmd))
-  return convert_string(stdout).rstrip('\r\n')
+  return stdout
 
 
 @contextlib.contextmanager
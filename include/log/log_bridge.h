@@ -0,0 +1,62 @@
+/*
+ * Copyright (c) Min.Wu - All Rights Reserved
+ * Unauthorized copying of this file, via any medium is strictly prohibited
+ * Proprietary and confidential
+ * Author: Min.Wu <wumin@126.com>, 2026/01/07
+ */
+
+#pragma once
+
+#include <stddef.h>
+
+/// @brief 给 ctypes 等 FFI 用的 C 接口，把外部（python）的日志记录交给
+///        common::g_wheel_logger，格式化、轮转和写文件都在 spdlog 里完成
+/// @details 参见 python/wcs_utils/logger/bridge.py
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/// @brief 级别与 spdlog::level::level_enum 相同
+enum WcsLogLevel {
+  WCS_LOG_LEVEL_TRACE = 0,
+  WCS_LOG_LEVEL_DEBUG = 1,
+  WCS_LOG_LEVEL_INFO = 2,
+  WCS_LOG_LEVEL_WARN = 3,
+  WCS_LOG_LEVEL_ERROR = 4,
+  WCS_LOG_LEVEL_CRITICAL = 5,
+  WCS_LOG_LEVEL_OFF = 6,
+};
+
+/// @brief 创建一个 SpdlogHelper 并设为 g_wheel_logger，重复调用会替换之前创建的
+/// @param log_dir 日志目录（支持 ~ 展开）
+/// @param log_file_name 日志文件名（不包含后缀）
+/// @param max_file_size_mb 单个日志文件最大大小（MB）
+/// @param max_log_files 最大保留的日志文件数量
+/// @param async_queue_size 大于 0 时使用异步 logger，队列长度（条）
+/// @return 0 成功，-1 失败（例如目录无法创建）
+int wcs_log_init(const char* log_dir, const char* log_file_name,
+                 size_t max_file_size_mb, size_t max_log_files,
+                 size_t async_queue_size);
+
+/// @brief g_wheel_logger 是否已经设置（由 wcs_log_init 或 C++ 的
+///        InitializeWheelLogger）
+int wcs_log_is_initialized(void);
+
+/// @brief 该级别的记录是否会被输出
+int wcs_log_should_log(int level);
+
+/// @brief 输出一条已经格式化好的记录
+/// @param filename 源文件名，内部会复制并缓存，调用返回后即可释放
+/// @param msg 消息，长度为 len，不需要以 0 结尾，不会再按 fmt 格式化
+/// @return 0 成功，-1 logger 未初始化或出错
+int wcs_log_record(int level, const char* filename, int line, const char* msg,
+                   size_t len);
+
+void wcs_log_flush(void);
+
+/// @brief 刷新并释放 wcs_log_init 创建的 logger
+void wcs_log_shutdown(void);
+
+#ifdef __cplusplus
+}  // extern "C"
+#endif
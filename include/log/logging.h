@@ -13,6 +13,12 @@
 #include <filesystem>
 #include <string>
 
+namespace spdlog {
+namespace details {
+class thread_pool;
+}  // namespace details
+}  // namespace spdlog
+
 namespace common {
 
 class SpdlogHelper;
@@ -21,27 +27,29 @@ void InitializeWheelLogger(SpdlogHelper* helper);
 
 /// @brief 便利宏：用于日志输出
 /// @details 使用示例：WCS_LOG_INFO("message {}", value);
+///          g_wheel_logger 可能被 log_bridge 替换或清空，宏里先原子地取一份
+///          shared_ptr，输出期间 logger 不会被释放
+#define WCS_LOG_IMPL_(logger_macro, fmt, ...)                     \
+  do {                                                            \
+    auto wcs_logger_ = ::common::GetWheelLogger();                \
+    if (wcs_logger_) {                                            \
+      logger_macro(wcs_logger_.get(), fmt, ##__VA_ARGS__);        \
+    }                                                             \
+  } while (0)
 #define WCS_LOG_TRACE(fmt, ...) \
-  if (::common::g_wheel_logger) \
-  SPDLOG_LOGGER_TRACE(::common::g_wheel_logger.get(), fmt, ##__VA_ARGS__)
+  WCS_LOG_IMPL_(SPDLOG_LOGGER_TRACE, fmt, ##__VA_ARGS__)
 #define WCS_LOG_DEBUG(fmt, ...) \
-  if (::common::g_wheel_logger) \
-  SPDLOG_LOGGER_DEBUG(::common::g_wheel_logger.get(), fmt, ##__VA_ARGS__)
-#define WCS_LOG_INFO(fmt, ...)  \
-  if (::common::g_wheel_logger) \
-  SPDLOG_LOGGER_INFO(::common::g_wheel_logger.get(), fmt, ##__VA_ARGS__)
-#define WCS_LOG_WARN(fmt, ...)  \
-  if (::common::g_wheel_logger) \
-  SPDLOG_LOGGER_WARN(::common::g_wheel_logger.get(), fmt, ##__VA_ARGS__)
+  WCS_LOG_IMPL_(SPDLOG_LOGGER_DEBUG, fmt, ##__VA_ARGS__)
+#define WCS_LOG_INFO(fmt, ...) \
+  WCS_LOG_IMPL_(SPDLOG_LOGGER_INFO, fmt, ##__VA_ARGS__)
+#define WCS_LOG_WARN(fmt, ...) \
+  WCS_LOG_IMPL_(SPDLOG_LOGGER_WARN, fmt, ##__VA_ARGS__)
 #define WCS_LOG_WARNING(fmt, ...) \
-  if (::common::g_wheel_logger)   \
-  SPDLOG_LOGGER_WARN(::common::g_wheel_logger.get(), fmt, ##__VA_ARGS__)
+  WCS_LOG_IMPL_(SPDLOG_LOGGER_WARN, fmt, ##__VA_ARGS__)
 #define WCS_LOG_ERROR(fmt, ...) \
-  if (::common::g_wheel_logger) \
-  SPDLOG_LOGGER_ERROR(::common::g_wheel_logger.get(), fmt, ##__VA_ARGS__)
+  WCS_LOG_IMPL_(SPDLOG_LOGGER_ERROR, fmt, ##__VA_ARGS__)
 #define WCS_LOG_CRITICAL(fmt, ...) \
-  if (::common::g_wheel_logger)    \
-  SPDLOG_LOGGER_CRITICAL(::common::g_wheel_logger.get(), fmt, ##__VA_ARGS__)
+  WCS_LOG_IMPL_(SPDLOG_LOGGER_CRITICAL, fmt, ##__VA_ARGS__)
 
 class SpdlogHelper {
  public:
@@ -61,6 +69,11 @@ class SpdlogHelper {
   /// @brief 获取全局 logger 对象
   std::shared_ptr<spdlog::logger> GetLogger() const;
 
+  /// @brief 使用异步 logger：格式化和写文件在后台线程，需在 SetLogPath 之前调用
+  /// @param queue_size 队列长度（条），满了阻塞调用方
+  /// @param thread_count 后台线程数
+  void EnableAsync(size_t queue_size = 8192, size_t thread_count = 1);
+
  private:
   /// @brief 生成带时间戳的日志文件名
   std::string GenerateLogFilename(const std::filesystem::path& log_dir,
@@ -70,7 +83,10 @@ class SpdlogHelper {
   std::filesystem::path ExpandPath(std::filesystem::path path);
 
  private:  // NOLINT
+  std::shared_ptr<spdlog::details::thread_pool> thread_pool_;  // 异步模式
   std::shared_ptr<spdlog::logger> logger_;
+  size_t async_queue_size_ = 0;
+  size_t async_thread_count_ = 1;
   size_t max_log_files_ = 3;
   size_t max_file_size_mb_ = 200;  // MB
 };
@@ -78,4 +94,9 @@ class SpdlogHelper {
 /// @brief 全局 logger 实例声明（实现在 logging.cpp）
 extern std::shared_ptr<spdlog::logger> g_wheel_logger;
 
+/// @brief 原子地读取 g_wheel_logger，读写它都要用 std::atomic_load/atomic_store
+inline std::shared_ptr<spdlog::logger> GetWheelLogger() {
+  return std::atomic_load(&g_wheel_logger);
+}
+
 }  // namespace common
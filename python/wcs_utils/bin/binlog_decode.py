@@ -0,0 +1,39 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import argparse
+import os
+import sys
+
+WCS_PY_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..")
+if os.path.exists(WCS_PY_ROOT):
+    sys.path.insert(0, WCS_PY_ROOT)
+
+from wcs_utils.logger.binlog import decode_file  # noqa: E402
+
+"""Render binlog files written by set_log_save_path(file_format="binary") back into text"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="render binlog files back into text")
+    parser.add_argument("files", help="*.binlog / *.binlog.N files", nargs="+")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)", default=None)
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for path in args.files:
+            for line in decode_file(path):
+                output.write(line)
+                output.write("\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import sys
+import time
+
+WCS_PY_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..")
+if os.path.exists(WCS_PY_ROOT):
+    sys.path.insert(0, WCS_PY_ROOT)
+
+from wcs_utils.logger.spdlog import GlogColorFormatter, format_message  # noqa: E402
+
+"""Micro-benchmark of GlogColorFormatter.format, records/sec against the original implementation"""
+
+
+class LegacyGlogColorFormatter(logging.Formatter):
+    """the original GlogColorFormatter, kept as the baseline"""
+
+    def __init__(self, use_color=True):
+        logging.Formatter.__init__(self)
+        self.use_color = use_color
+
+    def format(self, record):
+        try:
+            level = GlogColorFormatter.LEVEL_MAP[record.levelno]
+        except KeyError:
+            level = "?"
+
+        date = datetime.datetime.fromtimestamp(record.created)
+        microseconds = int((record.created - int(record.created)) * 1e6)
+        date_str = date.strftime("%Y-%m-%d %H:%M:%S")
+
+        if self.use_color:
+            record_message = "[%s.%06d %s:%d %s%s%s] %s" % (
+                date_str,
+                microseconds,
+                record.filename,
+                record.lineno,
+                GlogColorFormatter.COLOR_MAP[record.levelno],
+                level,
+                GlogColorFormatter.RESET,
+                format_message(record),
+            )
+        else:
+            record_message = "[%s.%06d %s:%d %s] %s" % (
+                date_str,
+                microseconds,
+                record.filename,
+                record.lineno,
+                level,
+                format_message(record),
+            )
+
+        record.getMessage = lambda: record_message
+        return logging.Formatter.format(self, record)
+
+
+def make_records(count):
+    """records spread over a few seconds, like a busy service logging thousands of lines/sec"""
+    start = time.time()
+    records = []
+    for i in range(count):
+        record = logging.LogRecord(
+            "wcs", logging.INFO, __file__, 42, "benchmark message %d: %s", (i, "payload"), None
+        )
+        record.created = start + i * 0.0002
+        records.append(record)
+    return records
+
+
+def records_per_second(formatters, count, repeat):
+    """format every record with each formatter, like one record going through several sinks
+
+    Fresh records are created for every run so that per-record caches start cold.
+    """
+    best = None
+    for _ in range(repeat):
+        records = make_records(count)
+        begin = time.perf_counter()
+        for record in records:
+            for formatter in formatters:
+                formatter.format(record)
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", help="records per run", type=int, default=100000)
+    parser.add_argument("--repeat", help="runs per case, best is reported", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        ("colored", [True]),
+        ("plain", [False]),
+        ("console+file", [True, False]),
+    ]
+    for name, use_colors in cases:
+        before = records_per_second(
+            [LegacyGlogColorFormatter(c) for c in use_colors], args.records, args.repeat
+        )
+        after = records_per_second(
+            [GlogColorFormatter(c) for c in use_colors], args.records, args.repeat
+        )
+        print(
+            "{:<13} before: {:>10.0f} records/s  after: {:>10.0f} records/s  "
+            "speedup: {:.2f}x".format(name, before, after, after / before)
+        )
+
+
+if __name__ == "__main__":
+    main()
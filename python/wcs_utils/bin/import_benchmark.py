@@ -0,0 +1,126 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+WCS_PY_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".."))
+
+"""Import and startup time of wcs_utils.logger, every run in a fresh interpreter, JSON output"""
+
+EXAMPLES = """examples:
+    # all cases, 20 interpreters each
+    import_benchmark.py --runs 20
+    # keep the result to compare releases
+    import_benchmark.py -o import-$(git describe).json
+"""
+
+# (name, setup timed inside the fresh interpreter)
+CASES = [
+    ("import_spdlog", "import wcs_utils.logger.spdlog"),
+    ("import_configure", "import wcs_utils.logger.spdlog as s; s.configure()"),
+    ("import_first_record", "import wcs_utils.logger.spdlog as s; s.info('ready')"),
+    ("import_parser", "import wcs_utils.logger.parser"),
+]
+
+CHILD = """import sys, time
+sys.path.insert(0, {root!r})
+begin = time.perf_counter()
+{statement}
+sys.stderr.write("%r\\n" % (time.perf_counter() - begin))
+"""
+
+
+def run_once(statement):
+    """(seconds of `statement`, seconds of the whole interpreter) in a new process"""
+    begin = time.perf_counter()
+    # console 输出丢掉，stderr 的最后一行是计时
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD.format(root=WCS_PY_ROOT, statement=statement)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True,
+    )
+    wall = time.perf_counter() - begin
+    return float(result.stderr.strip().splitlines()[-1]), wall
+
+
+def summarize(values):
+    return {
+        "median_ms": statistics.median(values) * 1e3,
+        "min_ms": min(values) * 1e3,
+        "max_ms": max(values) * 1e3,
+    }
+
+
+def run_case(name, statement, runs):
+    run_once(statement)
+    timings = [run_once(statement) for _ in range(runs)]
+    return {
+        "name": name,
+        "statement": statement,
+        "runs": runs,
+        "statement_time": summarize([t for t, _ in timings]),
+        "process_time": summarize([w for _, w in timings]),
+    }
+
+
+def print_result(result):
+    print("{:<24} {:>8.2f} ms  (min {:>7.2f} ms)  process {:>8.2f} ms".format(
+        result["name"], result["statement_time"]["median_ms"],
+        result["statement_time"]["min_ms"], result["process_time"]["median_ms"]),
+        file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="import and startup time of wcs_utils.logger",
+        epilog=EXAMPLES,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--runs", help="interpreters per case", type=int, default=10)
+    parser.add_argument("--case", help="only run the named case, can be repeated: {}".format(
+                        ", ".join(name for name, _ in CASES)), action="append", default=None)
+    parser.add_argument("-o", "--output", help="write the JSON result to a file instead of stdout",
+                        default=None)
+    args = parser.parse_args()
+
+    # 空解释器的启动时间作为基线
+    results = [run_case("baseline", "pass", args.runs)]
+    print_result(results[-1])
+    for name, statement in CASES:
+        if args.case is None or name in args.case:
+            results.append(run_case(name, statement, args.runs))
+            print_result(results[-1])
+
+    report = {
+        "time": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "cases": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
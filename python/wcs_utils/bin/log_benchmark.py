@@ -0,0 +1,341 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+WCS_PY_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..")
+if os.path.exists(WCS_PY_ROOT):
+    sys.path.insert(0, WCS_PY_ROOT)
+
+from wcs_utils.logger import bridge  # noqa: E402
+from wcs_utils.logger.handlers import (  # noqa: E402
+    BufferedRotatingFileHandler,
+    MmapRotatingFileHandler,
+)
+from wcs_utils.logger.spdlog import GlogColorFormatter  # noqa: E402
+from wcs_utils.logger.structured import JsonFormatter  # noqa: E402
+
+"""Throughput and latency benchmark of the wcs_utils.logger.spdlog sinks, JSON output"""
+
+EXAMPLES = """examples:
+    # all cases, up to 8 threads, summary on stdout
+    log_benchmark.py --threads 8
+    # keep the result to compare releases
+    log_benchmark.py --records 200000 -o bench-$(git describe).json
+    # python sinks against the C++ SpdlogHelper (compare with stdout_and_file)
+    log_benchmark.py --case stdout_and_file --case spdlog_bridge --case spdlog_bridge_async \
+        --bridge-library build/src/log/liblog_utils.so
+"""
+
+MESSAGE = "benchmark message %d: %s"
+ARG = "payload"
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_folder():
+    # tmpfs，测的是 logger 本身而不是磁盘
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+
+def percentiles(latencies):
+    latencies.sort()
+    count = len(latencies)
+
+    def at(fraction):
+        return latencies[min(count - 1, int(count * fraction))]
+
+    return {
+        "p50": at(0.5),
+        "p99": at(0.99),
+        "p999": at(0.999),
+        "max": latencies[-1],
+    }
+
+
+class Case(object):
+    """one logger configuration, built in a scratch folder and torn down afterwards"""
+
+    def __init__(self, name, make_handlers, level=logging.INFO, call_level=logging.INFO):
+        self.name = name
+        self.make_handlers = make_handlers
+        self.level = level
+        self.call_level = call_level
+
+    def setup(self, folder):
+        self.logger = logging.getLogger("wcs_benchmark." + self.name)
+        self.logger.propagate = False
+        self.logger.setLevel(self.level)
+        self.handlers = self.make_handlers(folder)
+        for h in self.handlers:
+            self.logger.addHandler(h)
+        return self.logger
+
+    def teardown(self):
+        for h in self.handlers:
+            self.logger.removeHandler(h)
+            h.close()
+
+
+class RedirectedStdoutHandler(logging.StreamHandler):
+    """the console sink, flushing every record, writing to a file standing in for stdout"""
+
+    def __init__(self, path):
+        logging.StreamHandler.__init__(self, open(path, "w"))
+
+    def close(self):
+        logging.StreamHandler.close(self)
+        self.stream.close()
+
+
+def stdout_handler(folder, use_color):
+    h = RedirectedStdoutHandler(os.path.join(folder, "stdout.txt"))
+    h.setFormatter(GlogColorFormatter(use_color=use_color))
+    return h
+
+
+def rotating_handler(folder, buffered=False, formatter=None, use_mmap=False):
+    filename = os.path.join(folder, "benchmark.log")
+    if use_mmap:
+        h = MmapRotatingFileHandler(filename, maxBytes=MAX_BYTES, backupCount=3)
+    elif buffered:
+        h = BufferedRotatingFileHandler(filename, maxBytes=MAX_BYTES, backupCount=3)
+    else:
+        h = logging.handlers.RotatingFileHandler(filename, maxBytes=MAX_BYTES, backupCount=3)
+    h.setFormatter(formatter or GlogColorFormatter(use_color=False))
+    return h
+
+
+class BridgeCase(Case):
+    """records handed to the C++ SpdlogHelper through wcs_utils.logger.bridge
+
+    SpdlogHelper writes a console and a rotating file sink, so stdout (fd 1) is
+    redirected to a file for the duration of the case, like the stdout_and_file case.
+    """
+
+    def __init__(self, name, library, async_queue_size):
+        Case.__init__(self, name, self.bridge_handlers)
+        self.library = library
+        self.async_queue_size = async_queue_size
+
+    def bridge_handlers(self, folder):
+        sys.stdout.flush()
+        self.saved_stdout = os.dup(1)
+        stdout = os.open(os.path.join(folder, "stdout.txt"), os.O_WRONLY | os.O_CREAT, 0o644)
+        os.dup2(stdout, 1)
+        os.close(stdout)
+        try:
+            return [
+                bridge.SpdlogBridgeHandler(
+                    self.library,
+                    log_dir=folder,
+                    log_file_name="benchmark",
+                    max_file_size_mb=MAX_BYTES // (1024 * 1024),
+                    max_log_files=3,
+                    async_queue_size=self.async_queue_size,
+                )
+            ]
+        except Exception:
+            self.restore_stdout()
+            raise
+
+    def restore_stdout(self):
+        os.dup2(self.saved_stdout, 1)
+        os.close(self.saved_stdout)
+
+    def teardown(self):
+        # 异步模式下 close() 等后台线程写完，计时里不包含
+        Case.teardown(self)
+        self.restore_stdout()
+
+
+def bridge_cases(library):
+    """the bridge cases, none if liblog_utils.so cannot be loaded"""
+    try:
+        bridge.load_library(library)
+    except OSError as e:
+        print("skip spdlog_bridge cases: {}".format(e), file=sys.stderr)
+        return []
+    return [
+        BridgeCase("spdlog_bridge", library, 0),
+        BridgeCase("spdlog_bridge_async", library, 8192),
+    ]
+
+
+CASES = [
+    Case("stdout_colored", lambda folder: [stdout_handler(folder, True)]),
+    Case("stdout_plain", lambda folder: [stdout_handler(folder, False)]),
+    Case("rotating_file", lambda folder: [rotating_handler(folder)]),
+    Case("rotating_file_buffered", lambda folder: [rotating_handler(folder, buffered=True)]),
+    Case("rotating_file_mmap", lambda folder: [rotating_handler(folder, use_mmap=True)]),
+    Case(
+        "rotating_file_json",
+        lambda folder: [rotating_handler(folder, formatter=JsonFormatter())],
+    ),
+    Case(
+        "stdout_and_file",
+        lambda folder: [stdout_handler(folder, True), rotating_handler(folder)],
+    ),
+    Case(
+        "disabled_level",
+        lambda folder: [stdout_handler(folder, True), rotating_handler(folder)],
+        call_level=logging.DEBUG,
+    ),
+]
+
+
+def run_calls(log, level, start, count, latencies):
+    """log `count` records, appending the latency of every call in ns"""
+    clock = time.perf_counter_ns
+    for i in range(start, start + count):
+        begin = clock()
+        log(level, MESSAGE, i, ARG)
+        latencies.append(clock() - begin)
+
+
+def run_untimed(log, level, count):
+    begin = time.perf_counter()
+    for i in range(count):
+        log(level, MESSAGE, i, ARG)
+    return time.perf_counter() - begin
+
+
+def run_case(case, folder, records, threads=None):
+    """run case in the calling thread, or in `threads` threads logging at the same time"""
+    scratch = tempfile.mkdtemp(prefix="wcs-log-benchmark-", dir=folder)
+    try:
+        log = case.setup(scratch).log
+        try:
+            run_untimed(log, case.call_level, min(records, 1000))
+
+            if threads is None:
+                elapsed = run_untimed(log, case.call_level, records)
+                latencies = []
+                run_calls(log, case.call_level, 0, records, latencies)
+            else:
+                per_thread = records // threads
+                records = per_thread * threads
+                results = [[] for _ in range(threads)]
+                barrier = threading.Barrier(threads + 1)
+
+                def worker(index):
+                    barrier.wait()
+                    run_calls(log, case.call_level, index * per_thread, per_thread, results[index])
+
+                workers = [
+                    threading.Thread(target=worker, args=(index,), name="bench-%d" % index)
+                    for index in range(threads)
+                ]
+                for t in workers:
+                    t.start()
+                barrier.wait()
+                begin = time.perf_counter()
+                for t in workers:
+                    t.join()
+                elapsed = time.perf_counter() - begin
+                latencies = [value for result in results for value in result]
+        finally:
+            # 失败的 case 也要卸下 handler、恢复 stdout
+            case.teardown()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        "name": case.name if threads is None else "%s_%d" % (case.name, threads),
+        "threads": threads or 1,
+        "records": records,
+        "records_per_sec": records / elapsed,
+        "latency_ns": percentiles(latencies),
+    }
+
+
+def print_result(result):
+    print("{:<32} {:>10.0f} records/s  p50 {:>6} ns  p99 {:>7} ns  p999 {:>8} ns".format(
+        result["name"], result["records_per_sec"], result["latency_ns"]["p50"],
+        result["latency_ns"]["p99"], result["latency_ns"]["p999"]), file=sys.stderr)
+
+
+def thread_counts(max_threads):
+    counts, n = [], 1
+    while n < max_threads:
+        counts.append(n)
+        n *= 2
+    counts.append(max_threads)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="throughput and latency of the wcs_utils.logger.spdlog sinks",
+        epilog=EXAMPLES,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--records", help="records per case", type=int, default=100000)
+    parser.add_argument("--threads",
+                        help="max threads of the contention cases (default: cpu count)",
+                        type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--folder", help="scratch folder, tmpfs by default",
+                        default=default_folder())
+    case_names = [case.name for case in CASES] + [
+        "spdlog_bridge", "spdlog_bridge_async", "contention"]
+    parser.add_argument("--case", help="only run the named case, can be repeated: {}".format(
+                        ", ".join(case_names)), action="append", default=None)
+    parser.add_argument("--bridge-library", help="liblog_utils.so for the spdlog_bridge cases "
+                        "(default: ${} or the linker search path)".format(bridge.LIBRARY_ENV),
+                        default=None)
+    parser.add_argument("-o", "--output", help="write the JSON result to a file instead of stdout",
+                        default=None)
+    args = parser.parse_args()
+
+    cases = [
+        case for case in CASES + bridge_cases(args.bridge_library)
+        if args.case is None or case.name in args.case
+    ]
+    # 1..N 个线程同时写同一个 rotating file sink
+    contention = Case("contention_threads", lambda folder: [rotating_handler(folder)])
+    results = []
+    for case in cases:
+        results.append(run_case(case, args.folder, args.records))
+        print_result(results[-1])
+    if args.case is None or "contention" in args.case:
+        for threads in thread_counts(max(1, args.threads)):
+            results.append(run_case(contention, args.folder, args.records, threads=threads))
+            print_result(results[-1])
+
+    report = {
+        "time": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "folder": args.folder,
+        "records": args.records,
+        "cases": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
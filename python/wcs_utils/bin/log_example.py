@@ -12,7 +12,7 @@ WCS_PY_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..")
 if os.path.exists(WCS_PY_ROOT):
     sys.path.insert(0, WCS_PY_ROOT)
 
-from wcs_utils.logger.spdlog import logger, set_log_save_path  # noqa: E402
+from wcs_utils.logger.spdlog import DEBUG, is_enabled, logger, set_log_save_path  # noqa: E402
 
 
 def logger_example():
@@ -20,10 +20,15 @@ def logger_example():
     set_log_save_path(os.path.join(home_path, "wcs_logs/wcs_utils"))
 
     logger.info("This is an info log message.")
-    logger.info("This is a formatted info log message: {}".format("Hello, World!"))
-    logger.info(
-        "This is a formatted info log message with args: {} and {}".format("test", 42)
-    )
+    # 参数延迟到输出时才格式化，与 C++ 的 WCS_LOG_INFO("message {}", value) 一致
+    logger.info("This is a formatted info log message: {}", "Hello, World!")
+    logger.info("This is a formatted info log message with args: {} and {}", "test", 42)
+    # 有 "{}" 时按 fmt 风格格式化，消息里的 "%" 原样输出
+    logger.info("100% done, {} files", 3)
+    logger.info("printf style still works: %d%%", 100)
+    logger.debug("Disabled levels skip argument rendering: {}", 3.14)
+    if is_enabled(DEBUG):
+        logger.debug("Expensive state: {}", sorted(os.environ))
     logger.warning("This is a warning log message.")
     logger.error("This is an error log message.")
 
@@ -0,0 +1,311 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+WCS_PY_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..")
+if os.path.exists(WCS_PY_ROOT):
+    sys.path.insert(0, WCS_PY_ROOT)
+
+from wcs_utils.logger import parser as log_parser  # noqa: E402
+from wcs_utils.logger import templates as log_templates  # noqa: E402
+from wcs_utils.logger.follow import LogFollower  # noqa: E402
+
+"""Query logs written by wcs_utils.logger.spdlog and the C++ SpdlogHelper"""
+
+EXAMPLES = """examples:
+    # errors from foo.py between 10:00 and 10:05 today
+    log_query.py query ~/wcs_logs --level error --file foo.py --since 10:00 --until 10:05
+    # (re)build the sidecar indexes
+    log_query.py index ~/wcs_logs
+    # level counts, top sites and error timeline of a whole fleet, on all cores
+    log_query.py scan ~/wcs_logs --top 20
+    # all workers' logs interleaved by timestamp
+    log_query.py merge ~/wcs_logs/worker_a ~/wcs_logs/worker_b --level warning
+    # C++ and python logs of one service as one stream
+    log_query.py merge ~/wcs_logs/planner.20260107-100000.12345.log ~/wcs_logs/planner_py
+    # follow warnings of all services across rotation and restarts, like tail -F
+    log_query.py follow ~/wcs_logs --level warning
+    # message templates of the warnings, with counts and example arguments
+    log_query.py cluster ~/wcs_logs --level warning --top 30
+    # live template counts of new records, reported every minute
+    log_query.py cluster ~/wcs_logs --follow --report-every 60
+"""
+
+DEFAULT_LOG_ROOT = os.path.join("~", "wcs_logs")
+
+
+def level_value(name):
+    levelno = log_parser.LEVELS.get(name.lower().encode())
+    if levelno is None:
+        raise argparse.ArgumentTypeError("unknown level {!r}".format(name))
+    return levelno
+
+
+def time_value(value):
+    try:
+        return log_parser.parse_time(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def add_query_arguments(parser):
+    parser.add_argument("--since", help="start time, 'HH:MM[:SS]' or 'YYYY-MM-DD HH:MM[:SS]'",
+                        type=time_value, default=None)
+    parser.add_argument("--until", help="end time (exclusive), same format as --since",
+                        type=time_value, default=None)
+    parser.add_argument("--level", help="minimum level: trace/debug/info/warning/error/fatal",
+                        type=level_value, default=None)
+    parser.add_argument("--file", help="source file of the record, 'name.py' or 'name.py:line'",
+                        default=None)
+    parser.add_argument("--grep", help="regex the message must match", default=None)
+
+
+def make_query(args):
+    return log_parser.Query(
+        since=args.since, until=args.until, level=args.level,
+        filename=args.file, pattern=args.grep,
+    )
+
+
+def cmd_query(args):
+    query = make_query(args)
+    output = sys.stdout.buffer
+    count = 0
+    for path in log_parser.find_log_files(args.paths):
+        for match, end, buf in log_parser.query_file(path, query, use_index=not args.no_index):
+            count += 1
+            if not args.count:
+                output.write(buf[match.start(): end])
+    if args.count:
+        print(count)
+    output.flush()
+
+
+def cmd_index(args):
+    for path in log_parser.find_log_files(args.paths):
+        index = log_parser.load_index(path, bucket=args.bucket)
+        print("{}: {} buckets, {} sparse offsets".format(
+            path, len(index["buckets"]), len(index["sparse"])))
+
+
+def cmd_scan(args):
+    query = make_query(args)
+    if not (query.constrained or query.timed or query.pattern):
+        query = None
+    summary = log_parser.scan_files(
+        log_parser.find_log_files(args.paths), query=query, jobs=args.jobs,
+        chunk_size=args.chunk_mb * 1024 * 1024,
+    )
+    result = {
+        "records": summary["records"],
+        "first": summary["first"],
+        "last": summary["last"],
+        "levels": dict(summary["levels"]),
+        "top_sites": summary["sites"].most_common(args.top),
+        "error_timeline": sorted(summary["errors"].items()),
+    }
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return
+
+    def fmt_time(value):
+        if value is None:
+            return "-"
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(value))
+
+    print("records: {}  ({} .. {})".format(
+        result["records"], fmt_time(result["first"]), fmt_time(result["last"])))
+    print("levels:")
+    for level, count in sorted(result["levels"].items(), key=lambda item: -item[1]):
+        print("    {:<8} {}".format(level, count))
+    print("top sites:")
+    for site, count in result["top_sites"]:
+        print("    {:<40} {}".format(site, count))
+    print("errors per minute:")
+    for minute, count in result["error_timeline"]:
+        print("    {} {}".format(fmt_time(minute)[:-3], count))
+
+
+def cmd_merge(args):
+    query = make_query(args)
+    if not (query.constrained or query.timed or query.pattern):
+        query = None
+    output = sys.stdout.buffer
+    for _, data in log_parser.merge_records(log_parser.find_log_files(args.paths), query):
+        output.write(data)
+    output.flush()
+
+
+def cmd_follow(args):
+    query = make_query(args)
+    if not (query.constrained or query.timed or query.pattern):
+        query = None
+    follower = LogFollower(args.paths, query, from_start=args.from_start,
+                           block_size=args.block_kb * 1024)
+    output = sys.stdout.buffer
+    try:
+        while True:
+            for data in follower.poll():
+                output.write(data)
+            output.flush()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        follower.close()
+
+
+def print_templates(miner, args):
+    result = {
+        "records": miner.records,
+        "templates": [t.to_dict() for t in miner.templates(args.top)],
+    }
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return
+    print("records: {}  templates: {}".format(miner.records, len(miner.templates())))
+    for template in result["templates"]:
+        print("{:>10}  {} .. {}  {}".format(
+            template["count"], template["first"][:19], template["last"][:19], template["site"]))
+        print("            {}".format(template["template"]))
+        for example in template["examples"]:
+            print("            e.g. {}".format(" | ".join(example)))
+
+
+def cmd_cluster(args):
+    query = make_query(args)
+    if not (query.constrained or query.timed or query.pattern):
+        query = None
+    if not args.follow:
+        miner = log_templates.mine_files(
+            log_parser.find_log_files(args.paths), query=query, jobs=args.jobs,
+            chunk_size=args.chunk_mb * 1024 * 1024, similarity=args.similarity,
+            examples=args.examples,
+        )
+        print_templates(miner, args)
+        return
+
+    miner = log_templates.TemplateMiner(similarity=args.similarity, examples=args.examples)
+    follower = LogFollower(args.paths, query, from_start=args.from_start)
+    reported = time.time()
+    try:
+        while True:
+            for record in follower.poll():
+                miner.add_record(record)
+            if time.time() - reported >= args.report_every:
+                reported = time.time()
+                print_templates(miner, args)
+                sys.stdout.flush()
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        follower.close()
+    print_templates(miner, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="query logs written by wcs_utils.logger.spdlog",
+        epilog=EXAMPLES,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    query_parser = subparsers.add_parser("query", help="print records matching the filters")
+    query_parser.add_argument("paths", help="log files or folders", nargs="*",
+                              default=[DEFAULT_LOG_ROOT])
+    add_query_arguments(query_parser)
+    query_parser.add_argument("--count", help="only print the number of records",
+                              action="store_true")
+    query_parser.add_argument("--no-index", help="scan without the sidecar index",
+                              action="store_true")
+    query_parser.set_defaults(func=cmd_query)
+
+    index_parser = subparsers.add_parser("index", help="build or refresh sidecar indexes")
+    index_parser.add_argument("paths", help="log files or folders", nargs="*",
+                              default=[DEFAULT_LOG_ROOT])
+    index_parser.add_argument("--bucket", help="index bucket in seconds", type=int, default=60)
+    index_parser.set_defaults(func=cmd_index)
+
+    scan_parser = subparsers.add_parser(
+        "scan", help="level counts, top sites and error timeline, in parallel")
+    scan_parser.add_argument("paths", help="log files or folders", nargs="*",
+                             default=[DEFAULT_LOG_ROOT])
+    add_query_arguments(scan_parser)
+    scan_parser.add_argument("-j", "--jobs", help="worker processes (default: cpu count)",
+                             type=int, default=None)
+    scan_parser.add_argument("--chunk-mb", help="chunk size per task in MB", type=int, default=64)
+    scan_parser.add_argument("--top", help="number of top sites", type=int, default=10)
+    scan_parser.add_argument("--json", help="print the summary as JSON", action="store_true")
+    scan_parser.set_defaults(func=cmd_scan)
+
+    merge_parser = subparsers.add_parser(
+        "merge", help="interleave records of many files by time, C++ and python")
+    merge_parser.add_argument("paths", help="log files or folders", nargs="*",
+                              default=[DEFAULT_LOG_ROOT])
+    add_query_arguments(merge_parser)
+    merge_parser.set_defaults(func=cmd_merge)
+
+    follow_parser = subparsers.add_parser(
+        "follow", help="print records appended to a log folder, across rotation and restarts")
+    follow_parser.add_argument("paths", help="log files or folders", nargs="*",
+                               default=[DEFAULT_LOG_ROOT])
+    add_query_arguments(follow_parser)
+    follow_parser.add_argument("--from-start", help="print the existing records first",
+                               action="store_true")
+    follow_parser.add_argument("--interval", help="seconds between polls", type=float,
+                               default=0.5)
+    follow_parser.add_argument("--block-kb", help="read size in KB", type=int, default=1024)
+    follow_parser.set_defaults(func=cmd_follow)
+
+    cluster_parser = subparsers.add_parser(
+        "cluster", help="group messages into templates with counts and example arguments")
+    cluster_parser.add_argument("paths", help="log files or folders", nargs="*",
+                                default=[DEFAULT_LOG_ROOT])
+    add_query_arguments(cluster_parser)
+    cluster_parser.add_argument("-j", "--jobs", help="worker processes (default: cpu count)",
+                                type=int, default=None)
+    cluster_parser.add_argument("--chunk-mb", help="chunk size per task in MB", type=int,
+                                default=64)
+    cluster_parser.add_argument("--top", help="number of templates to print", type=int,
+                                default=20)
+    cluster_parser.add_argument("--similarity", help="min share of equal tokens to join a "
+                                "template", type=float, default=0.4)
+    cluster_parser.add_argument("--examples", help="example arguments per template", type=int,
+                                default=3)
+    cluster_parser.add_argument("--json", help="print the templates as JSON",
+                                action="store_true")
+    cluster_parser.add_argument("--follow", help="mine records appended from now on, like "
+                                "follow", action="store_true")
+    cluster_parser.add_argument("--from-start", help="with --follow, mine the existing "
+                                "records first", action="store_true")
+    cluster_parser.add_argument("--interval", help="with --follow, seconds between polls",
+                                type=float, default=0.5)
+    cluster_parser.add_argument("--report-every", help="with --follow, seconds between "
+                                "reports", type=float, default=10)
+    cluster_parser.set_defaults(func=cmd_cluster)
+
+    args = parser.parse_args()
+    try:
+        args.func(args)
+    except BrokenPipeError:
+        # 输出被 head 等提前关闭
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
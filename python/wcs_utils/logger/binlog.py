@@ -0,0 +1,278 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import datetime
+import logging
+import logging.handlers
+import mmap
+import struct
+
+from wcs_utils.logger.spdlog import GlogColorFormatter, format_message, format_traceback
+
+"""Compact binary log sink (nanolog/spdlog style) and its decoder
+
+File layout, little endian:
+
+    MAGIC                                   once at the start of every (rotated) file
+    TAG_STRING  id:u32 len:u32 utf8         defines an interned filename / format string
+    TAG_RECORD  ts_us:i64 level:u8 flags:u8 file_id:u32 line:u32 fmt_id:u32
+                [message:str]               if flags & FLAG_INLINE_MESSAGE
+                nargs:u8 {type:u8 value}*   serialized args for the format string
+                [kv:str]                    if flags & FLAG_KV, "key=value ..." fields
+                [text:str]                  if flags & FLAG_TEXT, exception / stack text
+
+Strings are interned per file, so every file can be decoded on its own. Messages without
+args or with args that are not plain values are stored inline, already rendered.
+"""
+
+MAGIC = b"WCSBLOG1"
+
+TAG_STRING = 1
+TAG_RECORD = 2
+
+FLAG_INLINE_MESSAGE = 0x01
+FLAG_TEXT = 0x02
+FLAG_KV = 0x04
+
+ARG_NONE = 0
+ARG_TRUE = 1
+ARG_FALSE = 2
+ARG_INT = 3
+ARG_FLOAT = 4
+ARG_STR = 5
+
+_STRING = struct.Struct("<BII")
+_RECORD = struct.Struct("<BqBBIII")
+_U8 = struct.Struct("<B")
+_U32 = struct.Struct("<I")
+_INT = struct.Struct("<Bq")
+_FLOAT = struct.Struct("<Bd")
+
+_INT_MIN = -(1 << 63)
+_INT_MAX = (1 << 63) - 1
+
+
+def _encode_str(value):
+    data = value.encode("utf-8", "surrogateescape")
+    return _U32.pack(len(data)) + data
+
+
+def _encode_args(args):
+    """serialize args, None if any of them is not a plain value"""
+    if len(args) > 255:
+        return None
+    parts = [_U8.pack(len(args))]
+    for arg in args:
+        arg_type = type(arg)
+        if arg is None:
+            parts.append(_U8.pack(ARG_NONE))
+        elif arg_type is bool:
+            parts.append(_U8.pack(ARG_TRUE if arg else ARG_FALSE))
+        elif arg_type is int and _INT_MIN <= arg <= _INT_MAX:
+            parts.append(_INT.pack(ARG_INT, arg))
+        elif arg_type is float:
+            parts.append(_FLOAT.pack(ARG_FLOAT, arg))
+        elif arg_type is str:
+            parts.append(_U8.pack(ARG_STR) + _encode_str(arg))
+        else:
+            return None
+    return b"".join(parts)
+
+
+class BinaryRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler writing fixed-layout binary records instead of text"""
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, delay=False):
+        logging.handlers.RotatingFileHandler.__init__(
+            self, filename, maxBytes=maxBytes, backupCount=backupCount, delay=True
+        )
+        self.mode = "ab"
+        self.encoding = None
+        self._strings = {}
+        self.delay = delay
+        if not delay:
+            self.stream = self._open()
+
+    def _open(self):
+        stream = open(self.baseFilename, self.mode)
+        # 每个文件都自带 string 表，rotate 之后重新 intern
+        self._strings = {}
+        if stream.tell() == 0:
+            stream.write(MAGIC)
+        return stream
+
+    def _intern(self, value, parts):
+        string_id = self._strings.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings[value] = string_id
+            data = value.encode("utf-8", "surrogateescape")
+            parts.append(_STRING.pack(TAG_STRING, string_id, len(data)))
+            parts.append(data)
+        return string_id
+
+    def encode(self, record):
+        parts = []
+        created = record.created
+        seconds = int(created)
+        # 与 GlogColorFormatter.format_date 的微秒算法一致，解码结果逐字相同
+        timestamp = seconds * 1000000 + int((created - seconds) * 1e6)
+        flags = 0
+        file_id = self._intern(record.filename, parts)
+
+        args = record.args
+        encoded_args = None
+        if args and isinstance(args, tuple) and isinstance(record.msg, str):
+            encoded_args = _encode_args(args)
+        if encoded_args is not None:
+            fmt_id = self._intern(record.msg, parts)
+            payload = [encoded_args]
+        else:
+            flags |= FLAG_INLINE_MESSAGE
+            fmt_id = 0
+            payload = [_encode_str(str(format_message(record))), _U8.pack(0)]
+
+        # bind() 的上下文和 dict 参数，见 filters.ContextFilter
+        kv = record.__dict__.get("wcs_kv")
+        if kv:
+            flags |= FLAG_KV
+            payload.append(_encode_str(kv))
+
+        text = format_traceback(record)
+        if text:
+            flags |= FLAG_TEXT
+            payload.append(_encode_str(text))
+
+        level = min(max(record.levelno, 0), 255)
+        parts.append(
+            _RECORD.pack(TAG_RECORD, timestamp, level, flags, file_id, record.lineno, fmt_id)
+        )
+        parts.extend(payload)
+        return b"".join(parts)
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            data = self.encode(record)
+            if self.maxBytes > 0 and self.stream.tell() + len(data) >= self.maxBytes:
+                if self.stream.tell() > len(MAGIC):
+                    self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                    # 新文件的 string 表是空的，重新编码
+                    data = self.encode(record)
+            self.stream.write(data)
+            self.flush()
+        except Exception:
+            self.handleError(record)
+
+
+class _Message(object):
+    __slots__ = ("msg", "args")
+
+    def __init__(self, msg, args):
+        self.msg = msg
+        self.args = args
+
+
+def _decode_str(buf, offset):
+    (length,) = _U32.unpack_from(buf, offset)
+    offset += 4
+    return buf[offset: offset + length].decode("utf-8", "surrogateescape"), offset + length
+
+
+def _decode_args(buf, offset):
+    (nargs,) = _U8.unpack_from(buf, offset)
+    offset += 1
+    args = []
+    for _ in range(nargs):
+        (arg_type,) = _U8.unpack_from(buf, offset)
+        if arg_type == ARG_INT:
+            args.append(_INT.unpack_from(buf, offset)[1])
+            offset += _INT.size
+        elif arg_type == ARG_FLOAT:
+            args.append(_FLOAT.unpack_from(buf, offset)[1])
+            offset += _FLOAT.size
+        elif arg_type == ARG_STR:
+            value, offset = _decode_str(buf, offset + 1)
+            args.append(value)
+        elif arg_type == ARG_NONE:
+            args.append(None)
+            offset += 1
+        elif arg_type in (ARG_TRUE, ARG_FALSE):
+            args.append(arg_type == ARG_TRUE)
+            offset += 1
+        else:
+            raise ValueError("unknown arg type {} at offset {}".format(arg_type, offset))
+    return tuple(args), offset
+
+
+def decode(buf):
+    """yield (timestamp_us, levelno, filename, line, message) from a binlog buffer
+
+    `message` includes the key-value fields and, on following lines, exception / stack
+    text, like the text sink.
+    """
+    if buf[: len(MAGIC)] != MAGIC:
+        raise ValueError("not a wcs binlog file")
+    strings = {}
+    offset = len(MAGIC)
+    size = len(buf)
+    while offset < size:
+        tag = buf[offset]
+        if tag == TAG_STRING:
+            _, string_id, length = _STRING.unpack_from(buf, offset)
+            offset += _STRING.size
+            strings[string_id] = buf[offset: offset + length].decode("utf-8", "surrogateescape")
+            offset += length
+        elif tag == TAG_RECORD:
+            _, timestamp, level, flags, file_id, line, fmt_id = _RECORD.unpack_from(buf, offset)
+            offset += _RECORD.size
+            if flags & FLAG_INLINE_MESSAGE:
+                message, offset = _decode_str(buf, offset)
+                offset += 1
+            else:
+                args, offset = _decode_args(buf, offset)
+                message = str(format_message(_Message(strings[fmt_id], args)))
+            if flags & FLAG_KV:
+                kv, offset = _decode_str(buf, offset)
+                message = "%s %s" % (message, kv)
+            if flags & FLAG_TEXT:
+                text, offset = _decode_str(buf, offset)
+                message = "%s\n%s" % (message, text)
+            yield timestamp, level, strings[file_id], line, message
+        else:
+            raise ValueError("corrupted binlog: unknown tag {} at offset {}".format(tag, offset))
+
+
+def decode_file(path):
+    """yield `[YYYY-MM-DD HH:MM:SS.ffffff file:line level] msg` lines of a binlog file
+
+    The lines are identical to what GlogColorFormatter(use_color=False) writes, so they
+    can be parsed with SPDLOG_PREFIX_REGEX.
+    """
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            cached_seconds, date_str = None, ""
+            for timestamp, level, filename, line, message in decode(buf):
+                seconds, microseconds = divmod(timestamp, 1000000)
+                if seconds != cached_seconds:
+                    date_str = datetime.datetime.fromtimestamp(seconds).strftime(
+                        "%Y-%m-%d %H:%M:%S"
+                    )
+                    cached_seconds = seconds
+                yield "[%s.%06d %s:%d %s] %s" % (
+                    date_str,
+                    microseconds,
+                    filename,
+                    line,
+                    GlogColorFormatter.LEVEL_MAP.get(level, "?"),
+                    message,
+                )
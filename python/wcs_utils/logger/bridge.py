@@ -0,0 +1,147 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+
+from wcs_utils.logger.spdlog import render_body
+
+"""Hand python records to the C++ `common::g_wheel_logger` (src/log/log_bridge.cpp)
+
+Python only renders the message body; the prefix, the sinks, rotation and the disk
+writes are done by spdlog, in the one file the C++ side of the process writes. ctypes
+releases the GIL for the call, and with an async SpdlogHelper the call only enqueues
+the record.
+
+The library is liblog_utils.so, found by the `library` argument, the environment
+variable WCS_LOG_UTILS_LIB or the linker search path.
+"""
+
+LIBRARY_ENV = "WCS_LOG_UTILS_LIB"
+
+# spdlog::level::level_enum
+TRACE, DEBUG, INFO, WARN, ERROR, CRITICAL, OFF = range(7)
+
+_libraries = {}
+
+
+def spdlog_level(levelno):
+    """spdlog level of a python level number"""
+    if levelno < logging.DEBUG:
+        return TRACE
+    if levelno < logging.INFO:
+        return DEBUG
+    if levelno < logging.WARNING:
+        return INFO
+    if levelno < logging.ERROR:
+        return WARN
+    if levelno < logging.CRITICAL:
+        return ERROR
+    return CRITICAL
+
+
+def load_library(library=None):
+    """load liblog_utils.so once per path and declare the bridge functions"""
+    path = library or os.environ.get(LIBRARY_ENV) or ctypes.util.find_library("log_utils")
+    if not path:
+        raise OSError(
+            "liblog_utils.so not found, pass library= or set {}".format(LIBRARY_ENV)
+        )
+    lib = _libraries.get(path)
+    if lib is not None:
+        return lib
+    # CDLL 调用期间释放 GIL
+    lib = ctypes.CDLL(path)
+    lib.wcs_log_init.argtypes = [
+        ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t, ctypes.c_size_t, ctypes.c_size_t,
+    ]
+    lib.wcs_log_init.restype = ctypes.c_int
+    lib.wcs_log_is_initialized.argtypes = []
+    lib.wcs_log_is_initialized.restype = ctypes.c_int
+    lib.wcs_log_should_log.argtypes = [ctypes.c_int]
+    lib.wcs_log_should_log.restype = ctypes.c_int
+    lib.wcs_log_record.argtypes = [
+        ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_size_t,
+    ]
+    lib.wcs_log_record.restype = ctypes.c_int
+    lib.wcs_log_flush.argtypes = []
+    lib.wcs_log_flush.restype = None
+    lib.wcs_log_shutdown.argtypes = []
+    lib.wcs_log_shutdown.restype = None
+    _libraries[path] = lib
+    return lib
+
+
+def init(lib, log_dir, log_file_name, max_file_size_mb=200, max_log_files=3, async_queue_size=0):
+    """create the C++ SpdlogHelper and make it g_wheel_logger, see wcs_log_init()"""
+    result = lib.wcs_log_init(
+        os.fsencode(log_dir), log_file_name.encode(), max_file_size_mb, max_log_files,
+        async_queue_size,
+    )
+    if result != 0:
+        raise OSError("wcs_log_init({!r}, {!r}) failed".format(log_dir, log_file_name))
+
+
+class SpdlogBridgeHandler(logging.Handler):
+    """send records to the C++ g_wheel_logger instead of formatting and writing them
+
+    Without `log_dir` the logger the C++ side already initialized is used. With it a
+    SpdlogHelper is created (see `init()`) and shut down again by `close()`.
+    """
+
+    def __init__(
+        self,
+        library=None,
+        log_dir=None,
+        log_file_name="wcs_utils",
+        max_file_size_mb=200,
+        max_log_files=3,
+        async_queue_size=0,
+    ):
+        logging.Handler.__init__(self)
+        self.lib = load_library(library)
+        self.owner = log_dir is not None
+        if self.owner:
+            init(
+                self.lib, log_dir, log_file_name, max_file_size_mb, max_log_files,
+                async_queue_size,
+            )
+        elif not self.lib.wcs_log_is_initialized():
+            raise RuntimeError("common::g_wheel_logger is not initialized")
+        self._record = self.lib.wcs_log_record
+        self._files = {}
+
+    def handle(self, record):
+        # spdlog 的 logger 本身线程安全，不需要 Handler 的锁
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def emit(self, record):
+        try:
+            filename = record.filename
+            encoded = self._files.get(filename)
+            if encoded is None:
+                encoded = self._files[filename] = filename.encode()
+            body = render_body(record).encode("utf-8", "backslashreplace")
+            self._record(spdlog_level(record.levelno), encoded, record.lineno, body, len(body))
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.lib.wcs_log_flush()
+
+    def close(self):
+        logging.Handler.close(self)
+        if self.owner:
+            self.owner = False
+            self.lib.wcs_log_shutdown()
+        else:
+            self.lib.wcs_log_flush()
@@ -0,0 +1,238 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import contextlib
+import logging
+import threading
+
+"""Per call site rate limiting and sampling filters, and the bound context filter
+
+Every filter keeps its state per `filename:lineno`, the same site the formatter prints,
+so one noisy loop is throttled without touching the other log sites. The hot path is a
+dict lookup and a few integer / float operations.
+
+Suppressed records are not lost silently: the next record let through at that site is
+preceded by `suppressed N similar messages` from the same site and level, and
+`summarize()` reports what is still pending, e.g. on exit.
+"""
+
+
+class _Site(object):
+    __slots__ = ("count", "suppressed", "tokens", "last")
+
+    def __init__(self, now):
+        self.count = 0
+        self.suppressed = 0
+        self.tokens = 0.0
+        self.last = now
+
+
+class SiteFilter(logging.Filter):
+    """base of the per call site filters, subclasses implement `allow(site, now)`"""
+
+    SUMMARY = "suppressed %d similar messages"
+
+    def __init__(self):
+        logging.Filter.__init__(self)
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def new_site(self, now):
+        return _Site(now)
+
+    def allow(self, site, now):
+        raise NotImplementedError
+
+    def filter(self, record):
+        key = (record.filename, record.lineno)
+        now = record.created
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = self.new_site(now)
+            site.count += 1
+            if not self.allow(site, now):
+                site.suppressed += 1
+                return False
+            suppressed, site.suppressed = site.suppressed, 0
+        if suppressed:
+            self.emit_summary(record, suppressed)
+        return True
+
+    def emit_summary(self, record, suppressed):
+        """log `suppressed N similar messages` at the site and level of record
+
+        Goes straight to the handlers, so it is neither filtered nor counted again.
+        """
+        summary = logging.LogRecord(
+            record.name,
+            record.levelno,
+            record.pathname,
+            record.lineno,
+            self.SUMMARY,
+            (suppressed,),
+            None,
+            record.funcName,
+        )
+        logging.getLogger(record.name).callHandlers(summary)
+
+    def suppressed(self):
+        """{(filename, lineno): number of records suppressed since the last summary}"""
+        with self._lock:
+            return {key: site.suppressed for key, site in self._sites.items() if site.suppressed}
+
+    def summarize(self, level=logging.WARNING):
+        """log the pending summaries of all sites, e.g. before exit
+
+        Only filename and line of a suppressed record are known here, so the summary
+        is logged at `level`.
+        """
+        with self._lock:
+            pending = []
+            for (filename, lineno), site in self._sites.items():
+                if site.suppressed:
+                    pending.append((filename, lineno, site.suppressed))
+                    site.suppressed = 0
+        for filename, lineno, suppressed in pending:
+            record = logging.LogRecord(
+                "root", level, filename, lineno, self.SUMMARY, (suppressed,), None
+            )
+            logging.getLogger().callHandlers(record)
+
+    def reset(self):
+        with self._lock:
+            self._sites = {}
+
+
+class RateLimitFilter(SiteFilter):
+    """token bucket per site: `rate` records per second on average, bursts of `burst`"""
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive, got {!r}".format(rate))
+        SiteFilter.__init__(self)
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+
+    def new_site(self, now):
+        site = _Site(now)
+        site.tokens = self.burst
+        return site
+
+    def allow(self, site, now):
+        tokens = site.tokens + (now - site.last) * self.rate
+        site.last = now
+        if tokens > self.burst:
+            tokens = self.burst
+        if tokens >= 1.0:
+            site.tokens = tokens - 1.0
+            return True
+        site.tokens = tokens
+        return False
+
+
+class SampleFilter(SiteFilter):
+    """let 1 in `every` records of a site through, starting with the first one"""
+
+    def __init__(self, every):
+        if every < 1:
+            raise ValueError("every must be at least 1, got {!r}".format(every))
+        SiteFilter.__init__(self)
+        self.every = every
+
+    def allow(self, site, now):
+        return (site.count - 1) % self.every == 0
+
+
+class FirstThenSummaryFilter(SiteFilter):
+    """let the first `first` records of a site through, then one every `interval` seconds
+
+    Like glog's LOG_FIRST_N combined with LOG_EVERY_T: after the first records a site
+    shows up once per interval, preceded by the number of records suppressed since.
+    """
+
+    def __init__(self, first=10, interval=10.0):
+        SiteFilter.__init__(self)
+        self.first = first
+        self.interval = interval
+
+    def allow(self, site, now):
+        if site.count <= self.first:
+            site.last = now
+            return True
+        if now - site.last >= self.interval:
+            site.last = now
+            return True
+        return False
+
+
+_context = threading.local()
+
+
+def get_context():
+    """the key-value context bound to the current thread"""
+    return getattr(_context, "fields", None) or {}
+
+
+def bind(**fields):
+    """bind key-value context (e.g. a request id) to every record of the current thread"""
+    # 每次都换一个新的 dict，已经挂到 record 上的快照不会再被修改
+    context = dict(get_context())
+    context.update(fields)
+    _context.fields = context
+
+
+def unbind(*keys):
+    context = dict(get_context())
+    for key in keys:
+        context.pop(key, None)
+    _context.fields = context
+
+
+def clear_context():
+    _context.fields = None
+
+
+@contextlib.contextmanager
+def bound(**fields):
+    """bind fields for the duration of a with block, restoring the previous context"""
+    previous = getattr(_context, "fields", None)
+    bind(**fields)
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+
+def _is_placeholder_message(msg):
+    # "payload: %s" % {"a": 1} 这种格式化会用到 dict，不能当作 fields
+    return not isinstance(msg, str) or "%" in msg or "{" in msg
+
+
+class ContextFilter(logging.Filter):
+    """attach the key-value fields of a record in the calling thread
+
+    Fields are the thread's bound context plus a dict passed as the only argument,
+    `logger.info("order placed", {"order": 42})`, as long as the message has no "%" or
+    "{}" placeholder that would format it. They are kept as `record.wcs_fields` for the
+    JSON sink and `record.wcs_kv`, "key=value ...", appended to the text message.
+    Records without fields only cost an attribute lookup.
+    """
+
+    def filter(self, record):
+        context = getattr(_context, "fields", None)
+        args = record.args
+        if isinstance(args, dict) and args and not _is_placeholder_message(record.msg):
+            fields = dict(context) if context else {}
+            fields.update(args)
+        elif context:
+            fields = context
+        else:
+            return True
+        record.wcs_fields = fields
+        record.wcs_kv = " ".join(["%s=%s" % item for item in fields.items()])
+        return True
@@ -0,0 +1,186 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import os
+import time
+
+from wcs_utils.logger.handlers import data_end
+from wcs_utils.logger.parser import (
+    COMPRESSED_SUFFIXES,
+    PREFIX_PATTERN,
+    find_log_files,
+    iter_records,
+    open_log,
+    scan,
+)
+
+"""Follow log folders like `tail -F`, across rotation and restarts
+
+Segments are tracked by inode with an open descriptor, not by name: a rotation
+(`x.log` -> `x.log.1`, or `name.<time>.log` -> `name.<time>.1.log` for the C++ sink)
+only renames a file that is already followed, so it is read to the end through the
+same descriptor while the new `x.log` or the timestamped file of a restarted process
+is picked up from its first byte. Deleted segments are drained before they are closed.
+
+Appended data is read with pread() in large blocks and filtered with the prefix parser
+(see parser.scan) before anything is rendered. Complete lines are printed right away;
+continuation lines of a multi-line record that arrive later follow the filter decision
+of their record. The NUL padding of preallocated (mmap sink) files is only probed with a
+small read per poll.
+"""
+
+
+class _Segment(object):
+    __slots__ = ("path", "fd", "offset", "pending", "padded", "matched")
+
+    def __init__(self, path, fd, offset):
+        self.path = path
+        self.fd = fd
+        self.offset = offset
+        # 最后一行还没写完的部分
+        self.pending = b""
+        self.padded = False
+        # 已经输出的最后一条记录是否匹配，后面补上的行跟着它
+        self.matched = False
+
+
+class LogFollower(object):
+    """yield the records appended to the log files below `paths`, see the module doc
+
+    Existing files are followed from their end, or from the start with `from_start`.
+    Files that show up later are always read from the start.
+    """
+
+    def __init__(self, paths, query=None, from_start=False, block_size=1024 * 1024):
+        self.paths = paths
+        self.query = query
+        self.block_size = block_size
+        # 预分配文件的 NUL 区只用一个小块探测有没有新数据
+        self.probe_size = 4096
+        self._segments = {}
+        for key, path in self._oldest_first(self._list()):
+            self._open(key, path, at_end=not from_start)
+
+    def _list(self):
+        """{(st_dev, st_ino): (path, st_size, st_mtime_ns)} of the followed files"""
+        found = {}
+        for path in find_log_files(self.paths):
+            if path.endswith(COMPRESSED_SUFFIXES):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # 刚被删除或改名，下一轮再看
+                continue
+            found[(stat.st_dev, stat.st_ino)] = (path, stat.st_size, stat.st_mtime_ns)
+        return found
+
+    @staticmethod
+    def _oldest_first(found):
+        """(key, path) ordered by mtime, so that segments rotated between two polls are
+        read in the order they were written"""
+        entries = sorted(found.items(), key=lambda item: (item[1][2], item[1][0]))
+        return [(key, entry[0]) for key, entry in entries]
+
+    def _open(self, key, path, at_end):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        offset = 0
+        if at_end:
+            with open_log(path) as buf:
+                offset = data_end(buf)
+        self._segments[key] = _Segment(path, fd, offset)
+
+    def _close(self, key):
+        os.close(self._segments.pop(key).fd)
+
+    def _read(self, segment):
+        """yield the blocks appended to segment since the last read"""
+        while True:
+            size = self.probe_size if segment.padded else self.block_size
+            chunk = os.pread(segment.fd, size, segment.offset)
+            if not chunk:
+                return
+            end = data_end(chunk)
+            segment.padded = end < len(chunk)
+            if end:
+                segment.offset += end
+                yield chunk[:end] if segment.padded else chunk
+            if segment.padded or len(chunk) < size:
+                return
+
+    def _records(self, segment, buf, final=False):
+        """yield the complete lines of pending + buf that belong to matching records"""
+        if segment.pending:
+            buf = segment.pending + buf
+        cut = len(buf) if final else buf.rfind(b"\n") + 1
+        segment.pending = buf[cut:]
+        if not cut:
+            return
+        first = PREFIX_PATTERN.search(buf, 0, cut)
+        head = first.start() if first is not None else cut
+        if head and segment.matched:
+            yield buf[:head]
+        if first is None:
+            return
+        if self.query is None:
+            records = iter_records(buf, head, cut)
+        else:
+            records = scan(buf, self.query, head, cut)
+        end = None
+        for match, end in records:
+            yield buf[match.start(): end]
+        segment.matched = end == cut
+
+    def _drain(self, segment, final=False):
+        for block in self._read(segment):
+            for record in self._records(segment, block):
+                yield record
+        if final and segment.pending:
+            for record in self._records(segment, b"", final=True):
+                yield record
+
+    def poll(self):
+        """yield the matching records appended since the last poll"""
+        found = self._list()
+        for key, segment in list(self._segments.items()):
+            entry = found.get(key)
+            if entry is None:
+                # 被删除或压缩，读完剩下的再关掉
+                for record in self._drain(segment, final=True):
+                    yield record
+                self._close(key)
+                continue
+            path, size, _ = entry
+            segment.path = path
+            if size < segment.offset:
+                # 被截断，从头开始
+                segment.offset = 0
+                segment.pending = b""
+            if size <= segment.offset and not segment.padded:
+                continue
+            for record in self._drain(segment):
+                yield record
+        new = dict((key, entry) for key, entry in found.items() if key not in self._segments)
+        for key, path in self._oldest_first(new):
+            self._open(key, path, at_end=False)
+            if key in self._segments:
+                for record in self._drain(self._segments[key]):
+                    yield record
+
+    def follow(self, interval=0.5):
+        """poll every `interval` seconds forever, yielding the matching records"""
+        while True:
+            for record in self.poll():
+                yield record
+            time.sleep(interval)
+
+    def close(self):
+        for key in list(self._segments):
+            self._close(key)
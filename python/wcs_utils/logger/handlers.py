@@ -0,0 +1,692 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import gzip
+import logging
+import logging.handlers
+import mmap
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import traceback
+
+"""Extra logging handlers used by wcs_utils.logger.spdlog"""
+
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+_exception_formatter = logging.Formatter()
+
+
+def snapshot_record(record, formatter=None):
+    """render the message now unless all args are immutable plain values
+
+    The record can then be formatted later (on another thread, or after the caller
+    changed the arguments) and shows the state of the logging call. `formatter` must
+    return the message body only, default record.getMessage().
+    """
+    args = record.args
+    if not args or (
+        isinstance(args, tuple) and all(type(a) in _IMMUTABLE_ARG_TYPES for a in args)
+    ):
+        return record
+    if formatter is not None:
+        record.msg = formatter.format(record)
+    else:
+        record.msg = record.getMessage()
+    record.args = None
+    return record
+
+
+class AsyncHandler(logging.Handler):
+    """spdlog 风格的异步 logger：调用线程只把 record 放进有界队列，由单个后台线程写入各个 sink
+
+    overflow 策略对应 spdlog 的 async_overflow_policy:
+        block       -- 队列满时阻塞调用线程 (spdlog: block)
+        drop_oldest -- 丢弃队列中最旧的 record (spdlog: overrun_oldest)
+        drop_newest -- 丢弃当前的 record (spdlog: discard_new)
+    """
+
+    OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+    def __init__(self, sinks=(), queue_size=8192, overflow="block"):
+        if overflow not in AsyncHandler.OVERFLOW_POLICIES:
+            raise ValueError(
+                "overflow must be one of {}, got {!r}".format(
+                    AsyncHandler.OVERFLOW_POLICIES, overflow
+                )
+            )
+        logging.Handler.__init__(self)
+        self.sinks = list(sinks)
+        self.overflow = overflow
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(
+            target=self._worker, name="wcs-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def add_sink(self, sink):
+        # 整体替换列表，后台线程遍历的是旧列表，无需加锁
+        self.sinks = self.sinks + [sink]
+
+    def remove_sink(self, sink):
+        self.sinks = [s for s in self.sinks if s is not sink]
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def prepare(self, record):
+        """render the message in the caller thread, like spdlog does before enqueueing
+
+        Records whose args are all immutable plain values are queued as they are, the
+        writer thread renders them, see `snapshot_record`.
+        """
+        return snapshot_record(record, self.formatter)
+
+    def emit(self, record):
+        try:
+            record = self.prepare(record)
+            if self.overflow == "block":
+                self._queue.put(record)
+            elif self.overflow == "drop_newest":
+                try:
+                    self._queue.put_nowait(record)
+                except queue.Full:
+                    self.dropped += 1
+            else:
+                self._put_drop_oldest(record)
+        except Exception:
+            self.handleError(record)
+
+    def _put_drop_oldest(self, record):
+        while True:
+            try:
+                self._queue.put_nowait(record)
+                return
+            except queue.Full:
+                pass
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+
+    def _worker(self):
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    return
+                for sink in self.sinks:
+                    if record.levelno >= sink.level:
+                        sink.handle(record)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """block until every queued record has been written, then flush the sinks"""
+        if self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self._queue.join()
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        for sink in self.sinks:
+            sink.flush()
+        logging.Handler.close(self)
+
+
+def _zstd_module():
+    try:
+        from compression import zstd  # python >= 3.14
+    except ImportError:
+        return None
+    return zstd
+
+
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+
+def open_compressed(path, mode="rb"):
+    """open a .gz / .zst segment, plain open() for anything else"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    if path.endswith(".zst"):
+        zstd = _zstd_module()
+        if zstd is None:
+            raise IOError("zstd is not available in this python, cannot open " + path)
+        return zstd.open(path, mode)
+    return open(path, mode)
+
+
+class BufferedStreamHandler(logging.StreamHandler):
+    """StreamHandler that leaves flushing to the stream's own buffer
+
+    Records at or above `flush_level` are flushed at once; the rest go out when the
+    stream buffer fills up, on flush() or from a PeriodicFlusher.
+    """
+
+    def __init__(self, stream=None, flush_level=logging.ERROR):
+        logging.StreamHandler.__init__(self, stream)
+        self.flush_level = flush_level
+
+    def emit(self, record):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= self.flush_level:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+class BufferedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler that accumulates records and writes them in large chunks
+
+    Like spdlog's flush_on(level): records at or above `flush_level` write out the
+    buffer immediately, so no crash context is lost. Otherwise the buffer is written
+    once it holds `buffer_size` characters, on flush() or from a PeriodicFlusher.
+    buffer_size=0 writes and flushes every record like RotatingFileHandler.
+    """
+
+    def __init__(
+        self,
+        filename,
+        maxBytes=0,
+        backupCount=0,
+        buffer_size=64 * 1024,
+        flush_level=logging.ERROR,
+        delay=False,
+    ):
+        logging.handlers.RotatingFileHandler.__init__(
+            self, filename, maxBytes=maxBytes, backupCount=backupCount, delay=delay
+        )
+        self.buffer_size = buffer_size
+        self.flush_level = flush_level
+        self._buffer = []
+        self._buffered = 0
+
+    def emit(self, record):
+        try:
+            text = self.format(record) + self.terminator
+            self._buffer.append(text)
+            self._buffered += len(text)
+            if self._buffered >= self.buffer_size or record.levelno >= self.flush_level:
+                self.write_pending()
+                self.stream.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def write_pending(self):
+        """write the buffered texts, the caller holds the handler lock"""
+        if self._buffer:
+            texts, self._buffer, self._buffered = self._buffer, [], 0
+            write_texts(self, texts)
+
+    def flush(self):
+        self.acquire()
+        try:
+            self.write_pending()
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        logging.handlers.RotatingFileHandler.close(self)
+
+
+class PeriodicFlusher(object):
+    """flush the given handlers every `interval` seconds, like spdlog::flush_every"""
+
+    def __init__(self, interval, get_handlers):
+        self.interval = interval
+        self.get_handlers = get_handlers
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="wcs-log-flusher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            for h in self.get_handlers():
+                try:
+                    h.flush()
+                except Exception:
+                    traceback.print_exc(file=sys.stderr)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+class FlightRecorderHandler(logging.Handler):
+    """keep the last `capacity` records below `max_level` in a ring buffer, replay them on error
+
+    Like spdlog's backtrace: records with plain immutable args are kept raw and only
+    formatted when the buffer is dumped; other messages and exceptions are rendered
+    when recorded, so a dump shows the state at the logging call and the ring holds no
+    references to the caller's objects (see `snapshot_record`). A record at or above
+    `dump_level` dumps the buffer before it is written by the regular sinks, dump()
+    does it on demand. The records are written to the handlers returned by
+    `get_targets()`, regardless of their levels. The handler's formatter (if any) must
+    return the message body only.
+    """
+
+    def __init__(self, capacity=1024, get_targets=list, max_level=logging.INFO,
+                 dump_level=logging.ERROR):
+        logging.Handler.__init__(self)
+        self.capacity = capacity
+        self.get_targets = get_targets
+        self.max_level = max_level
+        self.dump_level = dump_level
+        self.dumps = 0
+        self._records = [None] * capacity
+        self._next = 0
+
+    def emit(self, record):
+        levelno = record.levelno
+        if levelno < self.max_level:
+            record = snapshot_record(record, self.formatter)
+            if record.exc_info:
+                # traceback 对象会引用所有栈帧
+                if not record.exc_text:
+                    record.exc_text = _exception_formatter.formatException(record.exc_info)
+                record.exc_info = None
+            self._records[self._next] = record
+            self._next = (self._next + 1) % self.capacity
+        elif levelno >= self.dump_level:
+            self.dump()
+
+    def take(self):
+        """remove and return the buffered records, oldest first"""
+        self.acquire()
+        try:
+            records = self._records[self._next:] + self._records[: self._next]
+            for i in range(self.capacity):
+                self._records[i] = None
+            self._next = 0
+        finally:
+            self.release()
+        return [record for record in records if record is not None]
+
+    def dump(self):
+        """format the buffered records and write them to the targets, returns their number"""
+        records = self.take()
+        if not records:
+            return 0
+        self.dumps += 1
+        for target in self.get_targets():
+            target.acquire()
+            try:
+                for record in records:
+                    target.emit(record)
+            finally:
+                target.release()
+            target.flush()
+        return len(records)
+
+
+class CompressingRotatingFileHandler(BufferedRotatingFileHandler):
+    """RotatingFileHandler that compresses rotated segments on a background thread
+
+    On rollover the calling thread only renames the full file out of the way and
+    reopens. The compressor thread then compresses it into `<file>.1.gz` (or `.zst`),
+    shifts the older segments and applies retention: at most `backupCount` segments
+    (0 for no count limit), at most `max_total_bytes` of segments and none older than
+    `max_age` seconds. With compression=None segments are kept as plain `<file>.N`.
+    Records are written through unless buffer_size is set, see BufferedRotatingFileHandler.
+    """
+
+    def __init__(
+        self,
+        filename,
+        maxBytes=0,
+        backupCount=0,
+        compression="gzip",
+        compresslevel=6,
+        max_total_bytes=None,
+        max_age=None,
+        buffer_size=0,
+        flush_level=logging.ERROR,
+        delay=False,
+    ):
+        if compression == "zstd" and _zstd_module() is None:
+            # 3.14 之前标准库没有 zstd，退回 gzip
+            compression = "gzip"
+        if compression is not None and compression not in COMPRESSION_SUFFIXES:
+            raise ValueError("unknown compression {!r}".format(compression))
+        BufferedRotatingFileHandler.__init__(
+            self,
+            filename,
+            maxBytes=maxBytes,
+            backupCount=backupCount,
+            buffer_size=buffer_size,
+            flush_level=flush_level,
+            delay=delay,
+        )
+        self.compression = compression
+        self.compresslevel = compresslevel
+        self.suffix = COMPRESSION_SUFFIXES.get(compression, "")
+        self.max_total_bytes = max_total_bytes
+        self.max_age = max_age
+        self.rotations = 0
+        self._pending = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._worker, name="wcs-log-compressor", daemon=True
+        )
+        self._thread.start()
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename):
+            self.rotations += 1
+            pending = "%s.rotating-%d-%d" % (self.baseFilename, os.getpid(), self.rotations)
+            os.rename(self.baseFilename, pending)
+            self._pending.put(pending)
+        if not self.delay:
+            self.stream = self._open()
+
+    def segment_name(self, number):
+        return "%s.%d%s" % (self.baseFilename, number, self.suffix)
+
+    def segments(self):
+        """[(number, path)] of the existing rotated segments, newest first"""
+        folder, base = os.path.split(self.baseFilename)
+        prefix = base + "."
+        found = []
+        for name in os.listdir(folder or "."):
+            if not name.startswith(prefix) or not name.endswith(self.suffix):
+                continue
+            number = name[len(prefix): len(name) - len(self.suffix)]
+            if number.isdigit():
+                found.append((int(number), os.path.join(folder, name)))
+        return sorted(found)
+
+    def _compress(self, source):
+        if self.compression is None:
+            return source
+        target = source + self.suffix
+        if self.compression == "gzip":
+            output = gzip.open(target, "wb", compresslevel=self.compresslevel)
+        else:
+            output = _zstd_module().open(target, "wb")
+        with open(source, "rb") as f, output:
+            shutil.copyfileobj(f, output, 1024 * 1024)
+        os.remove(source)
+        return target
+
+    def _install(self, compressed):
+        # 从最旧的开始往后挪：.N -> .N+1
+        for number, path in reversed(self.segments()):
+            os.replace(path, self.segment_name(number + 1))
+        os.replace(compressed, self.segment_name(1))
+
+    def _apply_retention(self):
+        now = time.time()
+        total = 0
+        for number, path in self.segments():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            total += stat.st_size
+            expired = (
+                self.backupCount > 0 and number > self.backupCount,
+                self.max_total_bytes is not None and total > self.max_total_bytes,
+                self.max_age is not None and now - stat.st_mtime > self.max_age,
+            )
+            if any(expired):
+                os.remove(path)
+
+    def _worker(self):
+        while True:
+            pending = self._pending.get()
+            try:
+                if pending is None:
+                    return
+                self._install(self._compress(pending))
+                self._apply_retention()
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+            finally:
+                self._pending.task_done()
+
+    def wait(self):
+        """block until every rotated segment has been compressed"""
+        if self._thread.is_alive():
+            self._pending.join()
+
+    def close(self):
+        # 先写出缓冲，最后一次 rollover 的分段也要交给压缩线程
+        self.flush()
+        if self._thread.is_alive():
+            self._pending.put(None)
+            self._thread.join()
+        BufferedRotatingFileHandler.close(self)
+
+
+def data_end(buf, block=1024 * 1024):
+    """length of buf without the NUL padding of a preallocated (mmap sink) file"""
+    end = len(buf)
+    if not end or buf[end - 1] != 0:
+        return end
+    while end > 0:
+        start = max(0, end - block)
+        chunk = buf[start:end].rstrip(b"\0")
+        if chunk:
+            return start + len(chunk)
+        end = start
+    return 0
+
+
+def _preallocate(fd, size):
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        # 不支持 fallocate 的平台 / 文件系统，退回稀疏文件
+        os.ftruncate(fd, size)
+
+
+class MmapRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """RotatingFileHandler copying records into a preallocated, memory-mapped segment
+
+    The file is extended to `maxBytes` when it is opened and mapped shared; emitting a
+    record is an encode and a copy at the current offset under the handler lock, no
+    write() or tell() per record. The page cache writes the data back and it survives
+    a crash of the process. On rollover and close the file is truncated to the data
+    actually written; until then it is padded with NULs, which
+    `wcs_utils.logger.parser` skips. With backupCount=0 the mapping grows by `maxBytes`
+    instead of rotating, like RotatingFileHandler which then keeps appending.
+    """
+
+    def __init__(self, filename, maxBytes, backupCount=0, encoding="utf-8", delay=False):
+        if maxBytes <= 0:
+            raise ValueError("the mmap sink needs maxBytes > 0, got {!r}".format(maxBytes))
+        logging.handlers.RotatingFileHandler.__init__(
+            self, filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding,
+            delay=True,
+        )
+        self.mode = "r+b"
+        self.delay = delay
+        self._fd = None
+        self._map = None
+        self._offset = 0
+        if not delay:
+            self._open_segment()
+
+    def _open_segment(self):
+        fd = os.open(self.baseFilename, os.O_RDWR | os.O_CREAT, 0o644)
+        offset = os.fstat(fd).st_size
+        if offset:
+            # 上次没有正常关闭时文件尾部是 NUL
+            with mmap.mmap(fd, offset, access=mmap.ACCESS_READ) as existing:
+                offset = data_end(existing)
+        size = max(self.maxBytes, offset)
+        _preallocate(fd, size)
+        self._fd = fd
+        self._map = mmap.mmap(fd, size)
+        self._offset = offset
+
+    def _close_segment(self):
+        if self._map is None:
+            return
+        self._map.close()
+        os.ftruncate(self._fd, self._offset)
+        os.close(self._fd)
+        self._fd, self._map, self._offset = None, None, 0
+
+    def _grow(self, size):
+        self._map.close()
+        _preallocate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def shouldRollover(self, record):
+        return False
+
+    def emit(self, record):
+        try:
+            data = (self.format(record) + self.terminator).encode(self.encoding, "replace")
+            if self._map is None:
+                self._open_segment()
+            end = self._offset + len(data)
+            if end > len(self._map):
+                if self.backupCount > 0 and self._offset > 0:
+                    self.doRollover()
+                    if self._map is None:
+                        self._open_segment()
+                    end = self._offset + len(data)
+                if end > len(self._map):
+                    # backupCount=0，或者单条 record 比整个 segment 还大
+                    self._grow(max(len(self._map) + self.maxBytes, end))
+            self._map[self._offset: end] = data
+            self._offset = end
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def doRollover(self):
+        self._close_segment()
+        if self.backupCount > 0:
+            for i in range(self.backupCount - 1, 0, -1):
+                source = self.rotation_filename("%s.%d" % (self.baseFilename, i))
+                target = self.rotation_filename("%s.%d" % (self.baseFilename, i + 1))
+                if os.path.exists(source):
+                    if os.path.exists(target):
+                        os.remove(target)
+                    os.rename(source, target)
+            target = self.rotation_filename(self.baseFilename + ".1")
+            if os.path.exists(target):
+                os.remove(target)
+            self.rotate(self.baseFilename, target)
+        if not self.delay:
+            self._open_segment()
+
+    def flush(self):
+        # 数据已经在 page cache 里，其他进程可见；需要落盘时用 sync()
+        pass
+
+    def sync(self):
+        """write the mapped pages back to disk (msync)"""
+        self.acquire()
+        try:
+            if self._map is not None:
+                self._map.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            self._close_segment()
+        finally:
+            self.release()
+        logging.handlers.RotatingFileHandler.close(self)
+
+
+def write_texts(handler, texts):
+    """write formatted texts through a text RotatingFileHandler, the caller holds its lock
+
+    Texts are joined into one write() per file, rolling over between records exactly
+    where the handler itself would.
+    """
+    if handler.stream is None:
+        handler.stream = handler._open()
+    position = handler.stream.tell()
+    parts, pending = [], 0
+    for text in texts:
+        if handler.maxBytes > 0 and position + pending > 0:
+            if position + pending + len(text) >= handler.maxBytes:
+                handler.stream.write("".join(parts))
+                handler.doRollover()
+                if handler.stream is None:
+                    handler.stream = handler._open()
+                position = handler.stream.tell()
+                parts, pending = [], 0
+        parts.append(text)
+        pending += len(text)
+    handler.stream.write("".join(parts))
+
+
+def write_batch(handler, records):
+    """format records and write them through a text RotatingFileHandler in one go"""
+    texts = [
+        handler.format(record) + handler.terminator
+        for record in records
+        if record.levelno >= handler.level
+    ]
+    if not texts:
+        return
+    handler.acquire()
+    try:
+        if isinstance(handler, BufferedRotatingFileHandler):
+            handler.write_pending()
+        write_texts(handler, texts)
+        handler.stream.flush()
+    finally:
+        handler.release()
+
+
+def run_log_collector(log_queue, sink, batch_size=1024):
+    """drain records from a multiprocessing queue into `sink` until a None sentinel
+
+    Everything already queued is taken in one go (up to `batch_size`), so under load
+    records go to disk in large writes.
+    """
+    # binary sinks (binlog "ab", mmap "r+b") write their own encoding record by record
+    batched = isinstance(sink, logging.handlers.RotatingFileHandler) and "b" not in sink.mode
+    while True:
+        batch = [log_queue.get()]
+        # collector 是唯一的读者，管道里有数据时 get() 不会阻塞
+        while len(batch) < batch_size and batch[-1] is not None and not log_queue.empty():
+            batch.append(log_queue.get())
+        stop = batch[-1] is None
+        records = batch[:-1] if stop else batch
+        try:
+            if batched:
+                write_batch(sink, records)
+            else:
+                for record in records:
+                    sink.handle(record)
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+        if stop:
+            return
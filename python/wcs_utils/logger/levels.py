@@ -0,0 +1,125 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import logging
+import os
+import sys
+import threading
+import traceback
+
+"""Level specs like spdlog's SPDLOG_LEVEL, and a control file to change them at runtime
+
+A spec is a comma or newline separated list of `level` (the root logger) and
+`name=level` entries, e.g. "info,wcs.planner=debug,wcs.io=warning". Lines starting
+with "#" are comments. Levels are the names used in the log prefix (including spdlog's
+"trace"), plus "critical",
+"warn", "off" and plain numbers.
+"""
+
+# spdlog 的 trace，C++ SpdlogHelper 的日志里会出现
+TRACE = 5
+
+LEVEL_NAMES = {
+    "trace": TRACE,
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warn": logging.WARNING,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+    "fatal": logging.FATAL,
+    "critical": logging.CRITICAL,
+    "off": logging.CRITICAL + 10,
+}
+
+ROOT = ""
+
+
+def parse_level(value):
+    if isinstance(value, int):
+        return value
+    value = value.strip().lower()
+    if value.isdigit():
+        return int(value)
+    try:
+        return LEVEL_NAMES[value]
+    except KeyError:
+        raise ValueError("unknown level {!r}".format(value))
+
+
+def parse_levels(spec):
+    """{logger name: levelno} of a level spec, ROOT ("") for the root logger"""
+    levels = {}
+    for line in spec.splitlines():
+        line = line.split("#", 1)[0]
+        for entry in line.split(","):
+            entry = entry.strip()
+            if not entry:
+                continue
+            name, sep, level = entry.rpartition("=")
+            levels[name.strip() if sep else ROOT] = parse_level(level)
+    return levels
+
+
+class LevelFileWatcher(object):
+    """poll a level spec file and apply it whenever its mtime or size changes
+
+    Loggers named in a previous version of the file but no longer in it go back to
+    NOTSET, i.e. inherit their parent's level again. `apply(name, levelno)` changes a
+    level; logging.Logger.setLevel clears the cached effective levels of all loggers.
+    """
+
+    def __init__(self, path, apply, interval=1.0):
+        """interval=None only checks on explicit check() calls, e.g. from a signal handler"""
+        self.path = path
+        self.apply = apply
+        self.interval = interval
+        self._signature = None
+        self._applied = set()
+        # check() 也会在信号处理函数里调用，需要可重入
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.check()
+        if interval is not None:
+            self._thread = threading.Thread(
+                target=self._run, name="wcs-log-levels", daemon=True
+            )
+            self._thread.start()
+
+    def check(self, force=False):
+        """apply the file if it changed since the last check, returns whether it did"""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return False
+            signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+            if signature == self._signature and not force:
+                return False
+            try:
+                with open(self.path) as f:
+                    levels = parse_levels(f.read())
+            except (OSError, ValueError):
+                traceback.print_exc(file=sys.stderr)
+                return False
+            self._signature = signature
+            for name in self._applied - set(levels):
+                if name != ROOT:
+                    self.apply(name, logging.NOTSET)
+            for name, levelno in levels.items():
+                self.apply(name, levelno)
+            self._applied = set(levels)
+            return True
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
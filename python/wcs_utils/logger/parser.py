@@ -0,0 +1,576 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import collections
+import contextlib
+import fnmatch
+import heapq
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from wcs_utils.logger.handlers import data_end, open_compressed
+from wcs_utils.logger.spdlog import SPDLOG_PREFIX_REGEX, GlogColorFormatter
+
+"""Streaming parser, sidecar index and queries for logs written by wcs_utils.logger.spdlog
+
+The C++ SpdlogHelper (src/log/logging.cpp) writes the same prefix plus a thread id,
+so its files are read by the same code.
+"""
+
+# SPDLOG_PREFIX_REGEX 以空白开头，strip 后 (?x) 才在表达式开头
+PREFIX_PATTERN = re.compile(SPDLOG_PREFIX_REGEX.strip().encode(), re.MULTILINE)
+
+LEVELS = {
+    name.encode(): levelno for levelno, name in GlogColorFormatter.LEVEL_MAP.items()
+}
+# C++ SpdlogHelper 的 %l，trace/debug/info/warning/error 与 python 相同
+LEVELS[b"critical"] = logging.CRITICAL
+
+# 也包括压缩后的 *.log.N.gz / *.log.N.zst
+LOG_FILE_PATTERNS = ("*.log", "*.log.[0-9]*")
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+INDEX_SUFFIX = ".idx"
+# 2: 前缀可带 C++ 的线程 id，旧 index 里 C++ 文件没有记录
+INDEX_VERSION = 2
+# 这些级别的每条记录都在 index 里保存 offset，查询时直接 seek
+SPARSE_LEVEL = logging.WARNING
+
+_minute_cache = {}
+
+
+def _replace_group(source, name, body):
+    """replace the body of the named group `(?P<name>...)` in a regex source"""
+    start = source.index("(?P<%s>" % name) + len("(?P<%s>" % name)
+    depth, in_class, i = 1, False, start
+    while depth:
+        char = source[i]
+        if char == "\\":
+            i += 1
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        i += 1
+    return source[:start] + body + source[i - 1:]
+
+
+def prefix_pattern(filename=None, line=None, levels=None):
+    """compile SPDLOG_PREFIX_REGEX with the filename/line/level groups pinned
+
+    Lets the regex engine skip non-matching records at C speed instead of checking
+    every record in python.
+    """
+    source = SPDLOG_PREFIX_REGEX.strip()
+    if filename is not None:
+        source = _replace_group(source, "filename", re.escape(filename))
+    if line is not None:
+        source = _replace_group(source, "line", re.escape(line))
+    if levels is not None:
+        source = _replace_group(source, "level", "|".join(re.escape(v) for v in levels))
+    return re.compile(source.encode(), re.MULTILINE)
+
+
+def minute_epoch(match):
+    """epoch seconds of the minute in a prefix match, cached per "YYYY-MM-DD HH:MM" """
+    key = match.group("year", "month", "day", "hour", "minute")
+    epoch = _minute_cache.get(key)
+    if epoch is None:
+        year, month, day, hour, minute = (int(v) for v in key)
+        epoch = time.mktime((year, month, day, hour, minute, 0, 0, 0, -1))
+        _minute_cache[key] = epoch
+    return epoch
+
+
+def match_time(match):
+    """epoch seconds (float) of a prefix match"""
+    second, microsecond = match.group("second", "microsecond")
+    return minute_epoch(match) + int(second) + int(microsecond) / 1e6
+
+
+def match_level(match):
+    return LEVELS.get(match.group("level"), 0)
+
+
+def parse_time(value):
+    """parse "YYYY-MM-DD HH:MM[:SS]" or "HH:MM[:SS]" (today) into epoch seconds"""
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M"):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            pass
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            parsed = time.strptime(value, fmt)
+        except ValueError:
+            continue
+        today = time.localtime()
+        return time.mktime(
+            (today.tm_year, today.tm_mon, today.tm_mday,
+             parsed.tm_hour, parsed.tm_min, parsed.tm_sec, 0, 0, -1)
+        )
+    raise ValueError("cannot parse time {!r}".format(value))
+
+
+def find_log_files(paths):
+    """expand directories into the `*.log` / `*.log.N` files below them, sorted"""
+    files = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+        for root, _, names in os.walk(path):
+            for name in names:
+                if name.endswith(INDEX_SUFFIX):
+                    continue
+                if any(fnmatch.fnmatch(name, p) for p in LOG_FILE_PATTERNS):
+                    files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+@contextlib.contextmanager
+def open_log(path):
+    """map a log file read-only, yields b"" for empty files
+
+    Compressed segments are decompressed into an anonymous temporary file first,
+    so they are read the same way and memory use does not grow with their size.
+    """
+    if path.endswith(COMPRESSED_SUFFIXES):
+        with tempfile.TemporaryFile() as f:
+            with open_compressed(path) as compressed:
+                shutil.copyfileobj(compressed, f, 1024 * 1024)
+            f.flush()
+            with _map(f) as buf:
+                yield buf
+        return
+    with open(path, "rb") as f:
+        with _map(f) as buf:
+            yield buf
+
+
+@contextlib.contextmanager
+def _map(f):
+    if os.fstat(f.fileno()).st_size == 0:
+        yield b""
+        return
+    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        yield buf
+    finally:
+        try:
+            buf.close()
+        except BufferError:
+            # 提前结束的 generator 里还有 match 引用着 buffer，交给 GC 回收
+            pass
+
+
+def iter_records(buf, start=0, end=None):
+    """yield (match, record_end) for every record starting in buf[start:end]
+
+    A record runs from its prefix to the next prefix, so multi-line messages such as
+    tracebacks stay with their record.
+    """
+    if end is None:
+        end = data_end(buf)
+    matches = PREFIX_PATTERN.finditer(buf, start, end)
+    previous = next(matches, None)
+    if previous is None:
+        return
+    for match in matches:
+        yield previous, match.start()
+        previous = match
+    yield previous, end
+
+
+def record_at(buf, offset, end=None):
+    """(match, record_end) of the record starting at `offset`, None if there is none"""
+    match = PREFIX_PATTERN.match(buf, offset)
+    if match is None:
+        return None
+    if end is None:
+        end = data_end(buf)
+    following = PREFIX_PATTERN.search(buf, match.end(), end)
+    return match, following.start() if following else end
+
+
+class Query(object):
+    """record filter: time range, minimum level, source file[:line] and message regex"""
+
+    def __init__(self, since=None, until=None, level=None, filename=None, pattern=None):
+        self.since = since
+        self.until = until
+        self.level = level
+        self.filename = None
+        self.line = None
+        if filename:
+            name, _, line = filename.partition(":")
+            self.filename = name.encode()
+            self.line = line.encode() if line else None
+        self.pattern = re.compile(pattern.encode()) if pattern else None
+
+        levels = None
+        if level is not None:
+            levels = [n.decode() for n, levelno in LEVELS.items() if levelno >= level]
+        self.constrained = self.filename is not None or levels is not None
+        self.prefix_pattern = prefix_pattern(
+            filename=name if filename else None,
+            line=line or None if filename else None,
+            levels=levels,
+        )
+
+    @property
+    def timed(self):
+        return self.since is not None or self.until is not None
+
+    def matches(self, buf, match, end):
+        if self.level is not None and match_level(match) < self.level:
+            return False
+        if self.filename is not None:
+            if match.group("filename") != self.filename:
+                return False
+            if self.line is not None and match.group("line") != self.line:
+                return False
+        if self.timed:
+            created = match_time(match)
+            if self.since is not None and created < self.since:
+                return False
+            if self.until is not None and created >= self.until:
+                return False
+        if self.pattern is not None and self.pattern.search(buf, match.end(), end) is None:
+            return False
+        return True
+
+
+def record_containing(buf, offset, start=0, end=None):
+    """(match, record_end) of the record that contains `offset`, None before the first one"""
+    while True:
+        line_start = max(buf.rfind(b"\n", start, offset) + 1, start)
+        found = record_at(buf, line_start, end)
+        if found is not None:
+            return found
+        if line_start <= start:
+            return None
+        offset = line_start - 1
+
+
+def _grep_records(buf, query, start, end):
+    """search the message regex first and map every hit back to its record"""
+    position = start
+    while position < end:
+        hit = query.pattern.search(buf, position, end)
+        if hit is None:
+            return
+        found = record_containing(buf, hit.start(), start, end)
+        if found is None:
+            position = hit.end()
+            continue
+        match, record_end = found
+        if query.matches(buf, match, record_end):
+            yield match, record_end
+        position = max(record_end, hit.end())
+
+
+def scan(buf, query, start=0, end=None):
+    """yield (match, record_end) of the records in buf[start:end] matching `query`"""
+    if end is None:
+        end = data_end(buf)
+    if query.constrained:
+        for match in query.prefix_pattern.finditer(buf, start, end):
+            following = PREFIX_PATTERN.search(buf, match.end(), end)
+            record_end = following.start() if following else end
+            if query.matches(buf, match, record_end):
+                yield match, record_end
+    elif query.pattern is not None:
+        for found in _grep_records(buf, query, start, end):
+            yield found
+    else:
+        for match, record_end in iter_records(buf, start, end):
+            if query.matches(buf, match, record_end):
+                yield match, record_end
+
+
+def index_path(path):
+    return path + INDEX_SUFFIX
+
+
+def _build_index(buf, start, bucket, index):
+    """append buckets and sparse offsets of the records from `start` to `index`"""
+    buckets = index["buckets"]
+    sparse = index["sparse"]
+    current = buckets[-1] if buckets else None
+    for match, end in iter_records(buf, start):
+        key = minute_epoch(match)
+        if bucket != 60:
+            key = match_time(match) // bucket * bucket
+        if current is None or current[0] != key:
+            current = [key, match.start(), end, {}]
+            buckets.append(current)
+        current[2] = end
+        level = match.group("level").decode()
+        counts = current[3]
+        counts[level] = counts.get(level, 0) + 1
+        if LEVELS.get(match.group("level"), 0) >= SPARSE_LEVEL:
+            sparse.append(match.start())
+    return index
+
+
+def load_index(path, bucket=60, save=True):
+    """load the sidecar index of a log file, (re)building or extending it when stale
+
+    The index holds one bucket per `bucket` seconds of consecutive records,
+    `[bucket_start, first_offset, end_offset, {level: count}]`, plus the offset of every
+    warning-or-above record. Appended files are indexed incrementally.
+    """
+    with open_log(path) as buf:
+        return _load_index(path, buf, bucket, save)
+
+
+_INDEX_KEYS = ("version", "bucket", "inode", "size", "buckets", "sparse")
+
+
+def _index_complete(index):
+    if not isinstance(index, dict) or not all(key in index for key in _INDEX_KEYS):
+        return False
+    return isinstance(index["size"], int)
+
+
+def _load_index(path, buf, bucket, save):
+    stat = os.stat(path)
+    # 预分配的 mmap sink 文件比实际内容大，按内容长度判断是否有新数据
+    size = data_end(buf)
+    index = None
+    expected = (INDEX_VERSION, bucket, stat.st_ino)
+    try:
+        with open(index_path(path)) as f:
+            index = json.load(f)
+        if not _index_complete(index):
+            # 旧的或手改过的 sidecar，当作过期重建
+            index = None
+        elif (index["version"], index["bucket"], index["inode"]) != expected:
+            index = None
+        elif index["size"] > size:
+            # 文件被截断或换成了新文件
+            index = None
+    except (IOError, OSError, ValueError):
+        index = None
+    if index is not None and index["size"] == size:
+        return index
+
+    if index is None or not index["buckets"]:
+        index = {"version": INDEX_VERSION, "bucket": bucket, "buckets": [], "sparse": []}
+        start = 0
+    else:
+        # 最后一个 bucket 可能不完整，从它的开头重新扫描
+        start = index["buckets"].pop()[1]
+        index["sparse"] = [offset for offset in index["sparse"] if offset < start]
+    index["inode"] = stat.st_ino
+    index["size"] = size
+    _build_index(buf, start, bucket, index)
+    if save:
+        try:
+            with open(index_path(path), "w") as f:
+                json.dump(index, f, separators=(",", ":"))
+        except (IOError, OSError):
+            pass
+    return index
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in ranges:
+        if merged and merged[-1][1] == start:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def query_file(path, query, use_index=True):
+    """yield (match, record_end, buf) of the records in `path` matching `query`
+
+    With the index only the buckets inside the time range are scanned, and level
+    queries at warning or above seek straight to the indexed offsets.
+    """
+    with open_log(path) as buf:
+        if not buf:
+            return
+        if not use_index:
+            for match, end in scan(buf, query):
+                yield match, end, buf
+            return
+
+        index = _load_index(path, buf, 60, True)
+        bucket = index["bucket"]
+        selected = index["buckets"]
+        if query.since is not None:
+            selected = [b for b in selected if b[0] + bucket > query.since]
+        if query.until is not None:
+            selected = [b for b in selected if b[0] < query.until]
+        if query.level is not None:
+            names = [n.decode() for n, levelno in LEVELS.items() if levelno >= query.level]
+            selected = [b for b in selected if any(b[3].get(n) for n in names)]
+        if not selected:
+            return
+
+        if query.level is not None and query.level >= SPARSE_LEVEL:
+            low = selected[0][1]
+            high = selected[-1][2]
+            for offset in index["sparse"]:
+                if offset < low or offset >= high:
+                    continue
+                found = record_at(buf, offset)
+                if found is not None and query.matches(buf, found[0], found[1]):
+                    yield found[0], found[1], buf
+            return
+
+        for start, end in _merge_ranges((b[1], b[2]) for b in selected):
+            for match, record_end in scan(buf, query, start, end):
+                yield match, record_end, buf
+
+
+def split_chunks(path, chunk_size=64 * 1024 * 1024):
+    """split a log file into (path, start, end) chunks whose bounds fall on record starts
+
+    A compressed segment is a single (path, 0, None) chunk, every chunk of it would be
+    decompressed again by its worker.
+    """
+    if path.endswith(COMPRESSED_SUFFIXES):
+        return [(path, 0, None)]
+    with open_log(path) as buf:
+        size = data_end(buf)
+        bounds = [0]
+        position = chunk_size
+        while position < size:
+            following = PREFIX_PATTERN.search(buf, position)
+            if following is None:
+                break
+            if following.start() > bounds[-1]:
+                bounds.append(following.start())
+            position = max(following.start(), position) + chunk_size
+        bounds.append(size)
+    return [(path, start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def new_summary():
+    return {
+        "records": 0,
+        "levels": collections.Counter(),
+        "sites": collections.Counter(),
+        # 每分钟的 error 及以上记录数
+        "errors": collections.Counter(),
+        "first": None,
+        "last": None,
+    }
+
+
+def merge_summary(total, summary):
+    total["records"] += summary["records"]
+    total["levels"].update(summary["levels"])
+    total["sites"].update(summary["sites"])
+    total["errors"].update(summary["errors"])
+    for key, pick in (("first", min), ("last", max)):
+        if summary[key] is not None:
+            total[key] = summary[key] if total[key] is None else pick(total[key], summary[key])
+    return total
+
+
+def scan_chunk(chunk, query=None):
+    """summarize the records of one (path, start, end) chunk: level counts, top
+    `filename:line` sites, per-minute error timeline and first/last timestamps"""
+    path, start, end = chunk
+    summary = new_summary()
+    levels = summary["levels"]
+    sites = summary["sites"]
+    errors = summary["errors"]
+    first = last = None
+    with open_log(path) as buf:
+        if query is None:
+            records = iter_records(buf, start, end)
+        else:
+            records = scan(buf, query, start, end)
+        for match, _ in records:
+            level, filename, line = match.group("level", "filename", "line")
+            levels[level] += 1
+            sites[(filename, line)] += 1
+            if LEVELS.get(level, 0) >= logging.ERROR:
+                errors[minute_epoch(match)] += 1
+            if first is None:
+                first = match
+            last = match
+        if first is not None:
+            summary["first"] = match_time(first)
+            summary["last"] = match_time(last)
+    summary["records"] = sum(levels.values())
+    summary["levels"] = collections.Counter({k.decode(): v for k, v in levels.items()})
+    summary["sites"] = collections.Counter(
+        {"%s:%s" % (f.decode(), n.decode()): v for (f, n), v in sites.items()}
+    )
+    return summary
+
+
+def _scan_chunk_star(args):
+    return scan_chunk(*args)
+
+
+def scan_files(paths, query=None, jobs=None, chunk_size=64 * 1024 * 1024):
+    """summarize many log files on a process pool, one task per record-aligned chunk
+
+    Workers map their chunk themselves and only send back the counters, so memory
+    stays bounded regardless of the total log size.
+    """
+    chunks = []
+    for path in paths:
+        chunks.extend(split_chunks(path, chunk_size))
+    total = new_summary()
+    if not chunks:
+        return total
+    jobs = min(jobs or multiprocessing.cpu_count(), len(chunks))
+    tasks = [(chunk, query) for chunk in chunks]
+    if jobs <= 1:
+        for task in tasks:
+            merge_summary(total, _scan_chunk_star(task))
+        return total
+    pool = multiprocessing.Pool(jobs)
+    try:
+        for summary in pool.imap_unordered(_scan_chunk_star, tasks):
+            merge_summary(total, summary)
+    finally:
+        pool.close()
+        pool.join()
+    return total
+
+
+def _timed_records(path, query):
+    with open_log(path) as buf:
+        records = iter_records(buf) if query is None else scan(buf, query)
+        for match, end in records:
+            yield match_time(match), buf[match.start(): end]
+
+
+def merge_records(paths, query=None):
+    """yield (timestamp, record bytes) of all files as one stream ordered by timestamp
+
+    A heap based k-way merge: every file is read sequentially and only one pending
+    record per file is held in memory. C++ SpdlogHelper files (`name.<time>.log`,
+    rotated to `name.<time>.N.log`) and python files can be mixed, records with the
+    same timestamp keep the order of `paths`.
+    """
+    streams = [_timed_records(path, query) for path in paths]
+    for created, data in heapq.merge(*streams, key=lambda item: item[0]):
+        yield created, data
@@ -5,21 +5,144 @@ Proprietary and confidential
 Author: Min.Wu <wumin@126.com>, 2026/01/07
 """
 
+import atexit
+import copy
 import datetime
 import logging
 import logging.handlers
 import os
+import re
 import sys
+import threading
 
-"""A simple spdlog-style logging wrapper"""
+# bind/bound/unbind/clear_context/get_context 是 spdlog 的公开接口
+from wcs_utils.logger.filters import (  # noqa: F401
+    ContextFilter,
+    FirstThenSummaryFilter,
+    RateLimitFilter,
+    SampleFilter,
+    bind,
+    bound,
+    clear_context,
+    get_context,
+    unbind,
+)
+from wcs_utils.logger.levels import TRACE, LevelFileWatcher, parse_level, parse_levels
+
+# handlers（gzip、mmap、queue、shutil）、stats（locale）和 signal 只在对应的
+# enable_*/set_*/watch_levels 里导入，不计入 import 时间
+
+"""A simple spdlog-style logging wrapper
+
+Importing the module does not touch the root logger. `configure()` installs the sinks
+and the level; the first access to `logger`, `info()` etc. or to one of the setup
+functions configures the defaults (or $WCS_LOG_CONFIG) if that has not happened yet.
+"""
+
+
+# str.format() 的替换字段：{}、{0}、{name}、{name!r}、{:>8} 等，不含转义的 {{
+_FORMAT_FIELD = re.compile(r"(?<!\{)\{(?:\w[\w.\[\]]*)?(?:![rsa])?(?::[^{}]*)?\}")
 
 
 def format_message(record):
-    try:
-        record_message = "%s" % (record.msg % record.args)
-    except TypeError:
-        record_message = record.msg
-    return record_message
+    """render record.msg with record.args
+
+    Besides printf-style placeholders, spdlog/fmt-style "{}" placeholders are accepted, so
+    `logger.info("message {}", value)` works like WCS_LOG_INFO("message {}", value) in
+    include/log/logging.h. A message with a "{}" / "{name}" field is formatted with
+    str.format() first, so a literal "%" in it ("100% done {}") is left alone; "%" is
+    only tried when that does not apply. Arguments are only rendered here, i.e. for
+    records that pass the level check.
+    """
+    msg = record.msg
+    args = record.args
+    if not args or not isinstance(msg, str):
+        return msg
+    if "{" in msg and _FORMAT_FIELD.search(msg):
+        try:
+            if isinstance(args, dict):
+                # logging 把唯一的 dict 参数当成了 args，"{}" 时它是位置参数
+                if "{}" in msg:
+                    return msg.format(args)
+                return msg.format(**args)
+            return msg.format(*args)
+        except (IndexError, KeyError, ValueError):
+            pass
+    if "%" in msg:
+        try:
+            return msg % args
+        except (TypeError, ValueError):
+            pass
+    return msg
+
+
+class LogRecord(logging.LogRecord):
+    """LogRecord whose getMessage() also renders "{}" placeholders, see `format_message`
+
+    `configure()` installs it as the record factory, so stdlib and third-party handlers
+    (pytest's caplog, Sentry, ...) render `logger.info("value {}", 42)` like our sinks.
+    """
+
+    def getMessage(self):
+        return str(format_message(self))
+
+
+class Lazy(object):
+    """argument whose value is computed only if the record is actually emitted
+
+    Example:
+        logger.debug("state: {}", Lazy(expensive_dump, obj))
+    """
+
+    __slots__ = ("func", "args", "kwargs")
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return str(self.func(*self.args, **self.kwargs))
+
+    def __repr__(self):
+        return repr(self.func(*self.args, **self.kwargs))
+
+    def __format__(self, format_spec):
+        return format(self.func(*self.args, **self.kwargs), format_spec)
+
+
+_exception_formatter = logging.Formatter()
+
+
+def format_traceback(record):
+    """render exception and stack text of the record, "" if it carries neither"""
+    if record.exc_info and not record.exc_text:
+        record.exc_text = _exception_formatter.formatException(record.exc_info)
+    text = record.exc_text or ""
+    if record.stack_info:
+        stack = _exception_formatter.formatStack(record.stack_info)
+        text = "%s\n%s" % (text, stack) if text else stack
+    return text
+
+
+def render_body(record):
+    """render the message body shared by all sinks: message, key-value fields, exception
+    and stack text
+
+    The result is cached on the record, so with both the console and the file handler
+    installed the message is only rendered once per record.
+    """
+    body = record.__dict__.get("_wcs_body")
+    if body is None:
+        body = str(format_message(record))
+        kv = record.__dict__.get("wcs_kv")
+        if kv:
+            body = "%s %s" % (body, kv)
+        text = format_traceback(record)
+        if text:
+            body = "%s\n%s" % (body, text)
+        record._wcs_body = body
+    return body
 
 
 class GlogColorFormatter(logging.Formatter):
@@ -29,6 +152,7 @@ class GlogColorFormatter(logging.Formatter):
         logging.WARN: "warning",
         logging.INFO: "info",
         logging.DEBUG: "debug",
+        TRACE: "trace",
     }
 
     GREY = "\x1b[38;21m"
@@ -39,6 +163,7 @@ class GlogColorFormatter(logging.Formatter):
     RESET = "\x1b[0m"
 
     COLOR_MAP = {
+        TRACE: GREY,
         logging.DEBUG: GREY,
         logging.INFO: GREEN,
         logging.WARNING: YELLOW,
@@ -49,58 +174,425 @@ class GlogColorFormatter(logging.Formatter):
     def __init__(self, use_color=True):
         logging.Formatter.__init__(self)
         self.use_color = use_color
+        # 每个级别的 tag 提前拼好，避免每条日志都查 COLOR_MAP/LEVEL_MAP
+        if use_color:
+            self._level_tags = {
+                levelno: "%s%s%s"
+                % (GlogColorFormatter.COLOR_MAP[levelno], name, GlogColorFormatter.RESET)
+                for levelno, name in GlogColorFormatter.LEVEL_MAP.items()
+            }
+        else:
+            self._level_tags = dict(GlogColorFormatter.LEVEL_MAP)
+        # (epoch 秒, "YYYY-MM-DD HH:MM:SS")，同一秒内的日志复用
+        self._date_cache = (None, "")
+
+    def format_date(self, created):
+        """return "YYYY-MM-DD HH:MM:SS.mmmmmm", the date part is cached per epoch second"""
+        seconds = int(created)
+        cached_seconds, date_str = self._date_cache
+        if cached_seconds != seconds:
+            date_str = datetime.datetime.fromtimestamp(seconds).strftime("%Y-%m-%d %H:%M:%S")
+            self._date_cache = (seconds, date_str)
+        microseconds = int((created - seconds) * 1e6)
+        return "%s.%06d" % (date_str, microseconds)
 
     def format(self, record):
-        try:
-            level = GlogColorFormatter.LEVEL_MAP[record.levelno]
-        except KeyError:
-            level = "?"
-
-        # 格式化时间为 YYYY-MM-DD HH:MM:SS.mmmmmm
-        date = datetime.datetime.fromtimestamp(record.created)
-        microseconds = int((record.created - int(record.created)) * 1e6)
-        date_str = date.strftime("%Y-%m-%d %H:%M:%S")
-
-        if self.use_color:
-            record_message = "[%s.%06d %s:%d %s%s%s] %s" % (
-                date_str,
-                microseconds,
-                record.filename,
-                record.lineno,
-                GlogColorFormatter.COLOR_MAP[record.levelno],
-                level,
-                GlogColorFormatter.RESET,
-                format_message(record),
-            )
-        else:
-            record_message = "[%s.%06d %s:%d %s] %s" % (
-                date_str,
-                microseconds,
-                record.filename,
-                record.lineno,
-                level,
-                format_message(record),
-            )
+        # "[date file:line " 与 body 对所有 sink 都相同，只算一次，各 sink 只拼接自己的 level tag
+        rendered = record.__dict__.get("_wcs_rendered")
+        if rendered is None:
+            head = "[%s %s:%d " % (self.format_date(record.created), record.filename, record.lineno)
+            rendered = (head, render_body(record))
+            record._wcs_rendered = rendered
+        return "%s%s] %s" % (rendered[0], self._level_tags.get(record.levelno, "?"), rendered[1])
+
 
-        record.getMessage = lambda: record_message
-        return logging.Formatter.format(self, record)
+class _MessageFormatter(logging.Formatter):
+    """formatter used by AsyncHandler to render the message body in the caller thread"""
+
+    def format(self, record):
+        return format_message(record)
 
 
-logger = logging.getLogger()
+_root = logging.getLogger()
+# key-value fields: logger.info("msg", {"key": value}) 和 bind(request_id=...) 绑定的上下文
+context_filter = ContextFilter()
 handler = logging.StreamHandler(sys.stdout)
 handler.flush = sys.stdout.flush
 file_handler = None
+async_handler = None
+# 文件 sink 是 SpdlogBridgeHandler 时，console 由 C++ SpdlogHelper 输出
+spdlog_bridge = None
+# multi-process 模式下的 collector 进程和它的队列
+log_queue = None
+collector = None
+_collector_owner = None
+# enable_buffering() 之后的缓冲参数和周期 flush 线程
+buffering = None
+flusher = None
+# 按调用点限流/采样的 filter，装在 root logger 和 get_logger() 的子 logger 上
+site_filters = []
+# get_logger() 创建的子 logger，以及 watch_levels() 的控制文件和被替换的信号处理函数
+loggers = {}
+level_watcher = None
+_level_signal = None
+# enable_flight_recorder() 之后 root 是 DEBUG，sink 保持原来的级别；
+# 被 recorder 改过的 sink 级别和 root 级别在 disable 时恢复
+recorder = None
+_recorder_levels = {}
+_recorder_root_level = None
+# enable_stats() 之后的计数器和周期输出线程
+log_stats = None
+stats_reporter = None
+# configure() 生效的配置，None 表示还没有初始化
+_config = None
+_config_lock = threading.RLock()
+
+CONFIG_ENV = "WCS_LOG_CONFIG"
+
+DEFAULT_CONFIG = {
+    "level": "info",
+    "levels": None,
+    "console": True,
+    "color": True,
+    "file": None,
+    "async_queue_size": 0,
+    "overflow": "block",
+}
+
+
+def load_config(path):
+    """read a JSON config file with the keys of DEFAULT_CONFIG, e.g.
+
+    {"level": "debug", "file": {"folder_path": "/var/log/wcs", "use_mmap": true},
+     "async_queue_size": 8192}
+    """
+    # json 只在用到配置文件时才导入，不计入 import 时间
+    import json
+
+    with open(os.path.expanduser(path)) as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("{}: the logger config must be a JSON object".format(path))
+    return config
+
+
+def configure(
+    config=None,
+    level=None,
+    levels=None,
+    console=None,
+    color=None,
+    file=None,
+    async_queue_size=None,
+    overflow=None,
+):
+    """set up the sinks and levels, see DEFAULT_CONFIG for the defaults
+
+    Explicit arguments override the values of `config`, which override the defaults;
+    settings not given go back to their defaults.
+    Only what differs from the configuration in effect is applied again, so calling
+    it twice with the same settings does nothing and never duplicates a sink. Sinks
+    installed by other functions are left alone unless their setting changes.
+
+    Args:
+        config(str|dict): path of a JSON config file (see `load_config`) or a dict
+        level(str|int): root level (default: "info")
+        levels(str): level spec for named loggers, e.g. "wcs.planner=debug"
+        console(bool): colored stdout sink (default: True)
+        color(bool): ANSI colors on the console (default: True)
+        file(str|dict): folder of the rotating file sink, or the keyword arguments
+            of `set_log_save_path` (default: None, no file)
+        async_queue_size(int): queue size of `enable_async`, 0 for none (default: 0)
+        overflow(str): overflow policy of `enable_async` (default: "block")
+    """
+    global _config
+    settings = dict(DEFAULT_CONFIG)
+    if config is not None:
+        settings.update(load_config(config) if isinstance(config, str) else config)
+    explicit = {
+        "level": level,
+        "levels": levels,
+        "console": console,
+        "color": color,
+        "file": file,
+        "async_queue_size": async_queue_size,
+        "overflow": overflow,
+    }
+    settings.update((key, value) for key, value in explicit.items() if value is not None)
+    unknown = set(settings) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError("unknown logger config keys: {}".format(", ".join(sorted(unknown))))
+    if isinstance(settings["file"], str):
+        settings["file"] = {"folder_path": settings["file"]}
+
+    with _config_lock:
+        if settings == _config:
+            return
+        previous = _config or {}
+        # 先记下来，下面调用的函数不会再触发默认初始化
+        _config = settings
+
+        def changed(*keys):
+            return any(settings[key] != previous.get(key) for key in keys)
+
+        if not previous:
+            _root.addFilter(context_filter)
+            # 别人装了自己的 factory 就不替换
+            if logging.getLogRecordFactory() is logging.LogRecord:
+                logging.setLogRecordFactory(LogRecord)
+            atexit.register(_shutdown)
+        if changed("async_queue_size", "overflow", "console", "file"):
+            disable_async()
+        if changed("color"):
+            handler.setFormatter(GlogColorFormatter(use_color=settings["color"]))
+        if changed("console"):
+            if _console_enabled():
+                _attach(handler)
+            else:
+                _detach(handler)
+        if changed("file"):
+            if settings["file"]:
+                set_log_save_path(**settings["file"])
+            else:
+                _remove_file_handler()
+        if changed("level"):
+            set_level(settings["level"])
+        if changed("levels") and settings["levels"]:
+            set_levels(settings["levels"])
+        if settings["async_queue_size"] and async_handler is None:
+            enable_async(settings["async_queue_size"], settings["overflow"])
+
+
+def is_configured():
+    return _config is not None
+
+
+def _ensure_configured():
+    # 热路径之外才会调用，初始化之后只是一次全局变量判断
+    if _config is None:
+        configure(os.environ.get(CONFIG_ENV))
 
 
-def set_level(new_level):
-    logger.setLevel(new_level)
-    logger.debug("Log level set to %s", new_level)
+def _attach(sink):
+    """attach sink to the root logger, or to the background writer in async mode"""
+    if recorder is not None and sink is not recorder and sink.level < recorder.max_level:
+        # debug record 只进 flight recorder
+        _recorder_levels.setdefault(sink, sink.level)
+        sink.setLevel(recorder.max_level)
+    if log_stats is not None:
+        log_stats.instrument(sink, _sink_name(sink))
+    if async_handler is not None:
+        async_handler.add_sink(sink)
+    else:
+        _root.addHandler(sink)
+
+
+def _detach(sink):
+    if async_handler is not None:
+        async_handler.remove_sink(sink)
+    _root.removeHandler(sink)
+
+
+def _sink_name(sink):
+    if sink is handler:
+        return "console"
+    if sink is file_handler:
+        return "file"
+    if sink is recorder:
+        return "flight_recorder"
+    return type(sink).__name__
+
+
+def _all_loggers():
+    return [_root] + list(loggers.values())
+
+
+def get_logger(name=None):
+    """named child logger with its own level, like spdlog's named loggers
+
+    Records go through the root logger's sinks; a child without a level of its own
+    follows the root level. The context and call site filters apply to it as well.
+    """
+    _ensure_configured()
+    if not name:
+        return _root
+    child = loggers.get(name)
+    if child is None:
+        child = logging.getLogger(name)
+        # logger 上的 filter 只对直接发给它的 record 生效，子 logger 要各装一份
+        child.addFilter(context_filter)
+        for site_filter in site_filters:
+            child.addFilter(site_filter)
+        if log_stats is not None:
+            child.filters.insert(0, log_stats)
+        loggers[name] = child
+    return child
+
+
+def set_level(new_level, name=None):
+    """set the level of the root logger, or of the child logger `name`
+
+    logging.Logger.setLevel drops the cached effective levels of all loggers, so the
+    change applies to the next call everywhere.
+    """
+    target = get_logger(name)
+    target.setLevel(parse_level(new_level))
+    target.debug("Log level set to %s", new_level)
+
+
+def set_levels(spec):
+    """apply a level spec like "info,wcs.planner=debug", see wcs_utils.logger.levels"""
+    for name, levelno in parse_levels(spec).items():
+        get_logger(name).setLevel(levelno)
+
+
+def watch_levels(path, interval=1.0, signum=None):
+    """apply the level spec in the control file `path` whenever it changes
+
+    The file is polled every `interval` seconds. With `signum` (e.g. signal.SIGUSR1),
+    the signal re-reads the file at once; interval=None relies on the signal only.
+    Loggers removed from the file inherit their parent's level again. None stops
+    watching.
+
+    Example:
+        watch_levels("/tmp/wcs_levels", signum=signal.SIGUSR1)
+        # $ echo "info,wcs.planner=debug" > /tmp/wcs_levels && kill -USR1 <pid>
+    """
+    import signal
+
+    global level_watcher, _level_signal
+    if _level_signal is not None:
+        # 恢复之前的信号处理函数，停掉的 watcher 不能再被信号触发
+        signal.signal(*_level_signal)
+        _level_signal = None
+    if level_watcher is not None:
+        level_watcher.stop()
+        level_watcher = None
+    if path is None:
+        return None
+    level_watcher = LevelFileWatcher(
+        path, lambda name, levelno: get_logger(name).setLevel(levelno), interval=interval
+    )
+    if signum is not None:
+        watcher = level_watcher
+        previous = signal.signal(signum, lambda received, frame: watcher.check(force=True))
+        _level_signal = (signum, previous)
+    return level_watcher
+
+
+def is_enabled(level, name=None):
+    """whether a record of `level` would be emitted, by the root or the child logger `name`
+
+    Uses the logger's cached effective level, so it is a dict lookup. Guard expensive
+    argument construction in hot loops with it:
+
+        if is_enabled(DEBUG):
+            logger.debug("state: {}", dump(state))
+    """
+    return get_logger(name).isEnabledFor(level)
+
+
+def _make_file_handler(
+    folder_path,
+    max_bytes,
+    backup_count,
+    file_format="text",
+    compression=None,
+    max_total_bytes=None,
+    max_age=None,
+    use_mmap=False,
+):
+    """create the rotating file sink `<argv0>.<timestamp>.log` in folder_path"""
+    if file_format not in ("text", "binary", "json"):
+        raise ValueError("unknown file_format {!r}".format(file_format))
+    background_rotation = (
+        compression is not None or max_total_bytes is not None or max_age is not None
+    )
+    if background_rotation and file_format == "binary":
+        raise ValueError("compression and retention limits are only supported for text logs")
+    if use_mmap and (background_rotation or file_format == "binary"):
+        raise ValueError("the mmap sink does not support binary logs, compression or retention")
+
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path)
+
+    now = datetime.datetime.now().strftime("%Y%m%d-%H%M%S.%f")
+    log_filename = os.path.join(
+        folder_path, "{}.{}.log".format(os.path.basename(sys.argv[0]), now)
+    )
+
+    if file_format == "binary":
+        from wcs_utils.logger.binlog import BinaryRotatingFileHandler
+
+        return BinaryRotatingFileHandler(
+            filename=log_filename[: -len(".log")] + ".binlog",
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+        )
+    from wcs_utils.logger.handlers import (
+        BufferedRotatingFileHandler,
+        CompressingRotatingFileHandler,
+        MmapRotatingFileHandler,
+    )
+
+    if file_format == "json":
+        log_filename = log_filename[: -len(".log")] + ".jsonl"
+    if use_mmap:
+        new_handler = MmapRotatingFileHandler(
+            filename=log_filename, maxBytes=max_bytes, backupCount=backup_count
+        )
+    elif background_rotation:
+        new_handler = CompressingRotatingFileHandler(
+            filename=log_filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            compression=compression,
+            max_total_bytes=max_total_bytes,
+            max_age=max_age,
+            **(buffering or {})
+        )
+    elif buffering is not None:
+        new_handler = BufferedRotatingFileHandler(
+            filename=log_filename, maxBytes=max_bytes, backupCount=backup_count, **buffering
+        )
+    else:
+        # Use RotatingFileHandler for log rotation
+        new_handler = logging.handlers.RotatingFileHandler(
+            filename=log_filename, maxBytes=max_bytes, backupCount=backup_count
+        )
+    if file_format == "json":
+        from wcs_utils.logger.structured import JsonFormatter
+
+        new_handler.setFormatter(JsonFormatter())
+    else:
+        new_handler.setFormatter(GlogColorFormatter(use_color=False))
+    return new_handler
+
+
+def _remove_file_handler():
+    global file_handler, spdlog_bridge
+    try:
+        if file_handler is not None:
+            _detach(file_handler)
+            file_handler.close()
+    except Exception:
+        pass
+    file_handler = None
+    if spdlog_bridge is not None:
+        spdlog_bridge = None
+        if _console_enabled():
+            _attach(handler)
 
 
 def set_log_save_path(
     folder_path=os.path.join(os.path.expanduser("~"), "wcs_logs", "wcs_utils"),
     max_bytes=200 * 1024 * 1024,
     backup_count=3,
+    file_format="text",
+    compression=None,
+    max_total_bytes=None,
+    max_age=None,
+    use_mmap=False,
 ):
     """set log save path with rotating file handler
 
@@ -108,43 +600,570 @@ def set_log_save_path(
         folder_path(str): folder path to save logs
         max_bytes(int): max bytes per log file (default: 200MB)
         backup_count(int): number of backup files to keep (default: 3)
+        file_format(str): "text", "json" for JSON lines (see wcs_utils.logger.structured)
+            or "binary" for the compact binlog sink, which `wcs_utils/bin/binlog_decode.py`
+            renders back to text (default: "text")
+        compression(str): "gzip" or "zstd" to compress rotated files on a background
+            thread, zstd falls back to gzip before python 3.14 (default: None)
+        max_total_bytes(int): max total bytes of rotated files, not binary (default: None)
+        max_age(float): max age in seconds of rotated files, not binary (default: None)
+        use_mmap(bool): copy records into a preallocated memory-mapped file instead of a
+            write() per record, not with binary, compression or retention (default: False)
 
     """
     # Try to remove old file handler
     global file_handler
-    try:
-        if file_handler is not None:
-            logger.removeHandler(file_handler)
-            file_handler.close()
-    except Exception:
-        pass
+    _ensure_configured()
+    disable_multiprocess()
+    _remove_file_handler()
+    file_handler = _make_file_handler(
+        folder_path,
+        max_bytes,
+        backup_count,
+        file_format=file_format,
+        compression=compression,
+        max_total_bytes=max_total_bytes,
+        max_age=max_age,
+        use_mmap=use_mmap,
+    )
+    _attach(file_handler)
 
-    if not os.path.exists(folder_path):
-        os.makedirs(folder_path)
 
-    now = datetime.datetime.now().strftime("%Y%m%d-%H%M%S.%f")
-    log_filename = os.path.join(
-        folder_path, "{}.{}.log".format(os.path.basename(sys.argv[0]), now)
+def enable_spdlog_bridge(
+    library=None,
+    folder_path=None,
+    file_name="wcs_utils",
+    max_file_size_mb=200,
+    max_log_files=3,
+    async_queue_size=8192,
+):
+    """write records through the C++ SpdlogHelper instead of the python sinks
+
+    Python only renders the message, spdlog formats the prefix, rotates and writes the
+    file (and the console) off the GIL, see wcs_utils.logger.bridge. The bridge takes
+    the place of the file sink and the python console sink is detached, SpdlogHelper
+    has its own. `set_log_save_path()` or `disable_spdlog_bridge()` switch back.
+
+    Args:
+        library(str): path of liblog_utils.so, default $WCS_LOG_UTILS_LIB or the linker
+            search path (default: None)
+        folder_path(str): create a SpdlogHelper writing to this folder, None to use the
+            g_wheel_logger the C++ side already initialized (default: None)
+        file_name(str): log file name without suffix (default: "wcs_utils")
+        max_file_size_mb(int): max MB per log file (default: 200)
+        max_log_files(int): number of log files to keep (default: 3)
+        async_queue_size(int): queue length of an async SpdlogHelper, 0 for a
+            synchronous one, only with folder_path (default: 8192)
+
+    Returns:
+        SpdlogBridgeHandler: the installed file sink
+    """
+    global file_handler, spdlog_bridge
+    _ensure_configured()
+    from wcs_utils.logger.bridge import SpdlogBridgeHandler
+
+    disable_multiprocess()
+    _remove_file_handler()
+    file_handler = SpdlogBridgeHandler(
+        library,
+        log_dir=folder_path,
+        log_file_name=file_name,
+        max_file_size_mb=max_file_size_mb,
+        max_log_files=max_log_files,
+        async_queue_size=async_queue_size,
     )
+    spdlog_bridge = file_handler
+    _detach(handler)
+    _attach(file_handler)
+    return file_handler
+
+
+def disable_spdlog_bridge():
+    """remove the bridge and re-attach the python console sink"""
+    if spdlog_bridge is not None:
+        _remove_file_handler()
+
+
+def _console_enabled():
+    # console sink 只在 configure(console=True) 且没有 spdlog bridge 时挂上
+    return _config is not None and _config["console"] and spdlog_bridge is None
+
+
+def _sinks():
+    console = handler if _console_enabled() else None
+    return [h for h in (console, file_handler) if h is not None]
+
+
+def enable_buffering(buffer_size=64 * 1024, flush_level=logging.ERROR, flush_interval=1.0):
+    """stop flushing every record, like spdlog's flush_on(level) plus flush_every(interval)
+
+    The console sink leaves flushing to the stdout buffer and text file sinks write
+    in `buffer_size` chunks. Records at or above `flush_level` flush immediately, so
+    the context of a crash is on disk, everything else is flushed at least every
+    `flush_interval` seconds and on exit.
+
+    Args:
+        buffer_size(int): characters buffered per file sink before a write (default: 64KB)
+        flush_level(int): records at or above this level are flushed at once (default: ERROR)
+        flush_interval(float): seconds between background flushes, None for none (default: 1.0)
+    """
+    from wcs_utils.logger.handlers import BufferedRotatingFileHandler, BufferedStreamHandler
+
+    global handler, file_handler, buffering
+    _ensure_configured()
+    buffering = {"buffer_size": buffer_size, "flush_level": flush_level}
+    if not isinstance(handler, BufferedStreamHandler):
+        new_handler = BufferedStreamHandler(handler.stream, flush_level=flush_level)
+        new_handler.setFormatter(handler.formatter)
+        new_handler.setLevel(handler.level)
+        _detach(handler)
+        handler = new_handler
+        if _console_enabled():
+            _attach(handler)
+    if type(file_handler) is logging.handlers.RotatingFileHandler:
+        # 已经打开的文件 sink 换成带缓冲的，接着写同一个文件
+        new_handler = BufferedRotatingFileHandler(
+            file_handler.baseFilename,
+            maxBytes=file_handler.maxBytes,
+            backupCount=file_handler.backupCount,
+            **buffering
+        )
+        new_handler.setFormatter(file_handler.formatter)
+        _remove_file_handler()
+        file_handler = new_handler
+        _attach(file_handler)
+    flush_on(flush_level)
+    if isinstance(file_handler, BufferedRotatingFileHandler):
+        file_handler.buffer_size = buffer_size
+    flush_every(flush_interval)
+
+
+def flush_on(level):
+    """flush the buffered sinks immediately on records at or above `level`"""
+    if buffering is not None:
+        buffering["flush_level"] = level
+    for sink in _sinks():
+        if hasattr(sink, "flush_level"):
+            sink.flush_level = level
+
+
+def flush_every(interval):
+    """flush all sinks every `interval` seconds on a background thread, None to stop"""
+    from wcs_utils.logger.handlers import PeriodicFlusher
+
+    global flusher
+    if flusher is not None:
+        flusher.stop()
+        flusher = None
+    if interval is not None:
+        flusher = PeriodicFlusher(interval, _sinks)
+
+
+def flush():
+    """write out everything buffered or queued so far"""
+    if async_handler is not None:
+        async_handler.flush()
+    for sink in _sinks():
+        sink.flush()
+
+
+def _add_site_filter(site_filter):
+    _ensure_configured()
+    site_filters.append(site_filter)
+    for target in _all_loggers():
+        target.addFilter(site_filter)
+    return site_filter
+
+
+def rate_limit(rate, burst=None):
+    """allow each call site `rate` records per second on average, bursts of `burst`
 
-    # Use RotatingFileHandler for log rotation
-    file_handler = logging.handlers.RotatingFileHandler(
-        filename=log_filename, maxBytes=max_bytes, backupCount=backup_count
+    Returns:
+        RateLimitFilter: the installed filter, see `remove_site_filters`
+    """
+    return _add_site_filter(RateLimitFilter(rate, burst))
+
+
+def sample(every):
+    """log only 1 in `every` records of each call site"""
+    return _add_site_filter(SampleFilter(every))
+
+
+def first_then_summary(first=10, interval=10.0):
+    """log the first `first` records of each call site, then one every `interval` seconds"""
+    return _add_site_filter(FirstThenSummaryFilter(first, interval))
+
+
+def remove_site_filters():
+    """log the pending suppression summaries and remove all call site filters"""
+    for site_filter in site_filters:
+        for target in _all_loggers():
+            target.removeFilter(site_filter)
+        site_filter.summarize()
+    del site_filters[:]
+
+
+def _recorder_targets():
+    if file_handler is not None:
+        return [file_handler]
+    return [handler]
+
+
+def enable_flight_recorder(capacity=1024, level=logging.INFO, dump_level=logging.ERROR):
+    """keep the last `capacity` records below `level` in memory, dump them on errors
+
+    The root logger goes to DEBUG while the sinks stay at `level`, or at the root level
+    in effect if that is higher; the records below are only kept in a fixed-size ring
+    buffer. `disable_flight_recorder()` restores the sink and root levels. A record at
+    or above `dump_level` (error, fatal, exception) first writes the buffered records to
+    the file sink (the console if there is none), so the debug context before the error
+    ends up in the log. `dump_flight_recorder()` does the same on demand.
+
+    Args:
+        capacity(int): number of records kept (default: 1024)
+        level(int): level the sinks keep, records below it are recorded (default: INFO)
+        dump_level(int): records at or above it trigger a dump (default: ERROR)
+
+    Returns:
+        FlightRecorderHandler: the installed recorder
+    """
+    from wcs_utils.logger.handlers import FlightRecorderHandler
+
+    global recorder, _recorder_root_level
+    _ensure_configured()
+    disable_flight_recorder()
+    sinks = _sinks()
+    for sink in sinks:
+        _detach(sink)
+    _recorder_root_level = _root.level
+    recorder = FlightRecorderHandler(
+        capacity,
+        get_targets=_recorder_targets,
+        max_level=max(level, _recorder_root_level),
+        dump_level=dump_level,
     )
-    file_handler.setFormatter(GlogColorFormatter(use_color=False))
-    logger.addHandler(file_handler)
+    # 记录时渲染的 "{}" 参数也要支持
+    recorder.setFormatter(_MessageFormatter())
+    # recorder 排在 sink 前面，先回放的 debug 记录再写触发它的 error
+    _attach(recorder)
+    for sink in sinks:
+        _attach(sink)
+    # root 原来低于 DEBUG（trace）时保持不变
+    _root.setLevel(min(logging.DEBUG, _recorder_root_level or logging.DEBUG))
+    return recorder
+
+
+def dump_flight_recorder():
+    """write the recorded records to the file sink now, returns how many were written"""
+    if recorder is None:
+        return 0
+    return recorder.dump()
+
+
+def disable_flight_recorder():
+    """remove the recorder, put the sinks and the root logger back to their levels"""
+    global recorder, _recorder_root_level
+    if recorder is None:
+        return
+    old_recorder, recorder = recorder, None
+    _detach(old_recorder)
+    for sink, sink_level in _recorder_levels.items():
+        sink.setLevel(sink_level)
+    _recorder_levels.clear()
+    _root.setLevel(_recorder_root_level)
+    _recorder_root_level = None
+
+
+def enable_stats(interval=None, top=10):
+    """count what logging itself costs, see `stats()`
+
+    Args:
+        interval(float): log a "logging stats: ..." line every `interval` seconds,
+            None for none (default: None)
+        top(int): number of call sites in the periodic line (default: 10)
+    """
+    from wcs_utils.logger.stats import LogStats, StatsReporter, format_stats
+
+    global log_stats, stats_reporter
+    _ensure_configured()
+    disable_stats()
+    log_stats = LogStats(GlogColorFormatter.LEVEL_MAP)
+    for target in _all_loggers():
+        # 排在限流/采样 filter 前面，被抑制的 record 也算在调用点上
+        target.filters.insert(0, log_stats)
+    for sink in _sinks() + ([recorder] if recorder is not None else []):
+        log_stats.instrument(sink, _sink_name(sink))
+    if async_handler is not None:
+        for sink in async_handler.sinks:
+            log_stats.instrument(sink, _sink_name(sink))
+    if interval is not None:
+        stats_reporter = StatsReporter(interval, lambda: _root.info(format_stats(stats(top))))
+    return log_stats
+
+
+def stats(top=10):
+    """counters of the logging pipeline since enable_stats(), {} if it was not called
+
+    Returns records per level, bytes / format time / emit time / rotations per sink,
+    async and multi-process queue depth and drops, and the `top` call sites by volume.
+    """
+    if log_stats is None:
+        return {}
+    snapshot = log_stats.snapshot(top)
+    if async_handler is not None:
+        snapshot["async"] = {"queue_depth": async_handler.qsize(), "dropped": async_handler.dropped}
+    if log_queue is not None:
+        # SimpleQueue 没有 qsize()，只能看管道里还有没有数据
+        depth = 0 if log_queue.empty() else None
+        snapshot["multiprocess"] = {"queue_depth": depth}
+    return snapshot
 
 
-set_level(logging.INFO)
+def disable_stats():
+    global log_stats, stats_reporter
+    if stats_reporter is not None:
+        stats_reporter.stop()
+        stats_reporter = None
+    if log_stats is None:
+        return
+    for target in _all_loggers():
+        target.removeFilter(log_stats)
+    sinks = _sinks() + ([recorder] if recorder is not None else [])
+    if async_handler is not None:
+        sinks += async_handler.sinks
+    for sink in sinks:
+        log_stats.uninstrument(sink)
+    log_stats = None
+
+
+class _CollectorQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler writing each record into the collector pipe in the calling thread
+
+    A multiprocessing.Queue hands records to a feeder thread; a pool worker killed by
+    Pool.terminate() (the `with Pool() as p:` idiom) loses what that thread still holds,
+    or leaves half a message in the pipe. Written synchronously, a record is in the
+    pipe before the logging call returns.
+    """
+
+    def prepare(self, record):
+        """copy of the record with the rendered message and the exception / stack text
+
+        Fields stay in `wcs_fields` / `wcs_kv` and the traceback in `exc_text`, so the
+        collector's formatter sees the same structure as an in-process sink.
+        """
+        text = format_traceback(record)
+        record = copy.copy(record)
+        record.msg = record.message = str(format_message(record))
+        record.args = None
+        record.exc_info = None
+        record.exc_text = text or None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record):
+        self.queue.put(record)
+
+
+def _run_log_collector(log_queue, file_options, batch_size):
+    import signal
+
+    from wcs_utils.logger.handlers import run_log_collector
+
+    # Ctrl+C 发给整个进程组，collector 要等 sentinel 才退出，保证日志写完
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sink = _make_file_handler(**file_options)
+    try:
+        run_log_collector(log_queue, sink, batch_size=batch_size)
+    finally:
+        sink.close()
+
+
+def attach_log_queue(new_queue):
+    """send this process' file logging to the collector owning `new_queue`
+
+    Forked workers inherit this automatically; call it in workers started with the
+    "spawn" / "forkserver" methods, e.g. as the pool initializer with `get_log_queue()`.
+    """
+    global file_handler
+    _ensure_configured()
+    _remove_file_handler()
+    file_handler = _CollectorQueueHandler(new_queue)
+    _attach(file_handler)
+
+
+def get_log_queue():
+    return log_queue
+
+
+def enable_multiprocess(
+    folder_path=os.path.join(os.path.expanduser("~"), "wcs_logs", "wcs_utils"),
+    max_bytes=200 * 1024 * 1024,
+    backup_count=3,
+    batch_size=1024,
+    context=None,
+    **file_options
+):
+    """write one log file per service from many processes through a collector process
+
+    This process and the workers it forks afterwards ship their records over a
+    multiprocessing queue to a single collector process, which owns the file sink and
+    its rotation and writes records in batches of up to `batch_size` per write() call.
+    The console handler stays local to every process.
+
+    Args:
+        folder_path(str): folder path to save logs
+        max_bytes(int): max bytes per log file (default: 200MB)
+        backup_count(int): number of backup files to keep (default: 3)
+        batch_size(int): max records per write (default: 1024)
+        context(str): multiprocessing start method of the workers, "fork", "spawn" or
+            "forkserver", the queue must come from the same context (default: None)
+        file_options: other `set_log_save_path` options, e.g. compression
+
+    Returns:
+        multiprocessing.SimpleQueue: the queue to pass to `attach_log_queue` in spawned
+            workers
+    """
+    global log_queue, collector, _collector_owner
+    import multiprocessing
+
+    _ensure_configured()
+    disable_multiprocess()
+    _remove_file_handler()
+    file_options = dict(
+        file_options, folder_path=folder_path, max_bytes=max_bytes, backup_count=backup_count
+    )
+    mp_context = multiprocessing.get_context(context)
+    # SimpleQueue.put() 直接写管道，没有 feeder 线程
+    new_queue = mp_context.SimpleQueue()
+    collector = mp_context.Process(
+        target=_run_log_collector,
+        args=(new_queue, file_options, batch_size),
+        name="wcs-log-collector",
+        daemon=True,
+    )
+    collector.start()
+    log_queue = new_queue
+    _collector_owner = os.getpid()
+    # multiprocessing 的 atexit 会先 terminate daemon 子进程，重新注册以保证 _shutdown 先执行
+    atexit.unregister(_shutdown)
+    atexit.register(_shutdown)
+    attach_log_queue(log_queue)
+    return log_queue
+
+
+def disable_multiprocess(timeout=10.0):
+    """flush and stop the collector started by `enable_multiprocess` in this process
+
+    A collector that has not written everything after `timeout` seconds (e.g. a worker
+    was killed while holding the queue's write lock) is terminated with a warning.
+    """
+    global log_queue, collector, _collector_owner
+    if collector is None or _collector_owner != os.getpid():
+        return
+    _remove_file_handler()
+    # 被 kill 的 worker 可能还拿着队列的写锁，sentinel 在另一个线程里发，不能卡住退出
+    sender = threading.Thread(target=log_queue.put, args=(None,), name="wcs-log-sentinel")
+    sender.daemon = True
+    sender.start()
+    collector.join(timeout)
+    if collector.is_alive():
+        _root.warning(
+            "log collector did not finish within %.1fs, terminating it, records may be lost",
+            timeout,
+        )
+        collector.terminate()
+        collector.join()
+    else:
+        log_queue.close()
+    log_queue, collector, _collector_owner = None, None, None
+
+
+def enable_async(queue_size=8192, overflow="block"):
+    """hand records to a bounded queue drained by a single background writer thread
+
+    Mirrors spdlog's async logger: the calling thread only renders the message and
+    enqueues the record, formatting of the prefix, disk writes and rotation happen
+    on the writer thread. Pending records are flushed on interpreter exit.
+
+    Args:
+        queue_size(int): max number of queued records (default: 8192)
+        overflow(str): "block", "drop_oldest" or "drop_newest" when the queue is full
+
+    Returns:
+        AsyncHandler: the installed async handler, see `AsyncHandler.dropped`
+    """
+    from wcs_utils.logger.handlers import AsyncHandler
+
+    global async_handler
+    _ensure_configured()
+    disable_async()
+
+    sinks = _sinks()
+    new_handler = AsyncHandler(sinks, queue_size=queue_size, overflow=overflow)
+    new_handler.setFormatter(_MessageFormatter())
+    for sink in sinks:
+        _root.removeHandler(sink)
+    async_handler = new_handler
+    _root.addHandler(async_handler)
+    return async_handler
+
+
+def disable_async():
+    """drain the queue, stop the writer thread and attach the sinks to the root logger again"""
+    global async_handler
+    if async_handler is None:
+        return
+    old_handler, async_handler = async_handler, None
+    _root.removeHandler(old_handler)
+    old_handler.close()
+    for sink in old_handler.sinks:
+        _root.addHandler(sink)
+
+
+def async_dropped():
+    """number of records dropped by the async overflow policy"""
+    if async_handler is None:
+        return 0
+    return async_handler.dropped
+
+
+def _shutdown():
+    # 先排空异步队列，再停 collector
+    flush_every(None)
+    disable_stats()
+    for site_filter in site_filters:
+        site_filter.summarize()
+    disable_async()
+    disable_multiprocess()
+    flush()
+
+
+# 第一次访问时才 configure()，之后直接是 root logger 的方法：关闭的级别只做一次缓存的
+# 级别判断，不会渲染参数
+_ROOT_METHODS = {
+    "debug": "debug",
+    "info": "info",
+    "warning": "warning",
+    "warn": "warning",
+    "error": "error",
+    "exception": "exception",
+    "fatal": "critical",
+    "log": "log",
+}
+
+
+def __getattr__(name):
+    # PEP 562，只对模块里不存在的名字调用
+    if name == "logger":
+        value = _root
+    elif name in _ROOT_METHODS:
+        value = getattr(_root, _ROOT_METHODS[name])
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    _ensure_configured()
+    globals()[name] = value
+    return value
 
-debug = logging.debug
-info = logging.info
-warning = logging.warning
-warn = logging.warning
-error = logging.error
-exception = logging.exception
-fatal = logging.fatal
-log = logging.log
 
 DEBUG = logging.DEBUG
 INFO = logging.INFO
@@ -171,9 +1190,13 @@ SPDLOG_PREFIX_REGEX = r"""
                         (?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2})
                         \.(?P<microsecond>\d{6})\s
                         (?P<filename>[a-zA-Z<_][\w._<>-]+):(?P<line>\d+)\s
+                        (?:(?P<thread>\d+)\s)?
                         (?P<level>[a-z]+)
                         \]\s
                         """
-"""Regex you can use to parse spdlog line prefixes."""
+"""Regex you can use to parse spdlog line prefixes.
+
+Also matches the C++ SpdlogHelper prefix `[%Y-%m-%d %H:%M:%S.%f %s:%# %t %l]`, whose
+thread id is the optional `thread` group.
+"""
 handler.setFormatter(GlogColorFormatter())
-logger.addHandler(handler)
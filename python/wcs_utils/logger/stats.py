@@ -0,0 +1,183 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import collections
+import locale
+import logging
+import sys
+import threading
+import time
+import traceback
+
+"""Counters and timers of the logging pipeline itself
+
+LogStats is a filter on the loggers, it counts every record once where it is created:
+per level and per `filename:line`. Sinks are instrumented by wrapping their format()
+and emit() (and doRollover()) on the instance, which adds two perf_counter() calls per
+record and sink. Sink counters are only updated under the handler lock.
+"""
+
+
+def _sink_encoding(sink):
+    """encoding the sink writes its text with: its own, its stream's or the locale's"""
+    encoding = getattr(sink, "encoding", None)
+    if not encoding:
+        encoding = getattr(getattr(sink, "stream", None), "encoding", None)
+    return encoding or locale.getpreferredencoding(False)
+
+
+class LogStats(logging.Filter):
+    def __init__(self, level_names=None):
+        logging.Filter.__init__(self)
+        self.level_names = level_names or {}
+        self.started = time.time()
+        self.levels = collections.Counter()
+        self.sites = collections.Counter()
+        self.sinks = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.filename, record.lineno)
+        with self._lock:
+            self.levels[record.levelno] += 1
+            self.sites[key] += 1
+        return True
+
+    def instrument(self, sink, name):
+        """count records, bytes, format / emit time and rotations of `sink` as `name`
+
+        Bytes are those of the text encoded with the sink's encoding, plus the newline.
+        """
+        if "emit" in sink.__dict__:
+            return
+        counters = self.sinks.get(name)
+        if counters is None:
+            counters = self.sinks[name] = {
+                "records": 0,
+                "bytes": 0,
+                "format_seconds": 0.0,
+                "emit_seconds": 0.0,
+                "rotations": 0,
+            }
+        clock = time.perf_counter
+        format_, emit = sink.format, sink.emit
+        encoding = _sink_encoding(sink)
+        # RotatingFileHandler.shouldRollover() 也会 format 一次，字节数在 emit 之后才累加
+        written = [0]
+
+        def timed_format(record):
+            begin = clock()
+            text = format_(record)
+            counters["format_seconds"] += clock() - begin
+            # ASCII 的字符数就是字节数，isascii() 不用扫描字符串
+            if text.isascii():
+                written[0] = len(text) + 1
+            else:
+                written[0] = len(text.encode(encoding, "replace")) + 1
+            return text
+
+        def timed_emit(record):
+            begin = clock()
+            emit(record)
+            counters["emit_seconds"] += clock() - begin
+            counters["records"] += 1
+            counters["bytes"] += written[0]
+            written[0] = 0
+
+        sink.format = timed_format
+        sink.emit = timed_emit
+        if hasattr(sink, "encode"):
+            # binlog sink 不经过 format()
+            encode = sink.encode
+
+            def counted_encode(record):
+                data = encode(record)
+                written[0] = len(data)
+                return data
+
+            sink.encode = counted_encode
+        if hasattr(sink, "doRollover"):
+            rollover = sink.doRollover
+
+            def counted_rollover():
+                counters["rotations"] += 1
+                rollover()
+
+            sink.doRollover = counted_rollover
+
+    def uninstrument(self, sink):
+        for method in ("format", "emit", "encode", "doRollover"):
+            sink.__dict__.pop(method, None)
+
+    def snapshot(self, top=10):
+        """dict of all counters; format and emit time of the sinks are in seconds
+
+        `emit_seconds` includes `format_seconds`, the rest is the time spent writing.
+        """
+        with self._lock:
+            levels = dict(self.levels)
+            sites = self.sites.most_common(top)
+        sinks = dict((name, dict(counters)) for name, counters in self.sinks.items())
+        return {
+            "seconds": time.time() - self.started,
+            "records": sum(levels.values()),
+            "levels": dict(
+                (self.level_names.get(levelno, str(levelno)), count)
+                for levelno, count in sorted(levels.items())
+            ),
+            "sinks": sinks,
+            "format_seconds": sum(s["format_seconds"] for s in sinks.values()),
+            "emit_seconds": sum(s["emit_seconds"] for s in sinks.values()),
+            "rotations": sum(s["rotations"] for s in sinks.values()),
+            "top_sites": [["%s:%d" % site, count] for site, count in sites],
+        }
+
+
+def format_stats(snapshot):
+    """one line summary of a snapshot, for the periodic stats record"""
+    parts = [
+        "records=%d" % snapshot["records"],
+        " ".join("%s=%d" % item for item in snapshot["levels"].items()),
+    ]
+    for name, sink in sorted(snapshot["sinks"].items()):
+        parts.append(
+            "%s(bytes=%d format=%.3fs emit=%.3fs)"
+            % (name, sink["bytes"], sink["format_seconds"], sink["emit_seconds"])
+        )
+    parts.append("rotations=%d" % snapshot["rotations"])
+    for name in ("async", "multiprocess"):
+        queue_stats = snapshot.get(name)
+        if queue_stats:
+            parts.append(
+                "%s(queue=%s dropped=%s)"
+                % (name, queue_stats.get("queue_depth"), queue_stats.get("dropped", 0))
+            )
+    if snapshot["top_sites"]:
+        parts.append("top=" + ",".join("%s(%d)" % tuple(site) for site in snapshot["top_sites"]))
+    return "logging stats: " + " ".join(part for part in parts if part)
+
+
+class StatsReporter(object):
+    """call `report()` every `interval` seconds on a background thread"""
+
+    def __init__(self, interval, report):
+        self.interval = interval
+        self.report = report
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="wcs-log-stats", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.report()
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
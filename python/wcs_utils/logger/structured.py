@@ -0,0 +1,104 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import json
+import logging
+from json.encoder import encode_basestring
+
+from wcs_utils.logger.spdlog import GlogColorFormatter, format_message, format_traceback
+
+"""JSON-lines records, so that consumers can skip SPDLOG_PREFIX_REGEX
+
+One object per line, keys in this order:
+
+    {"time": 1767768000.123456, "level": "info", "file": "foo.py", "line": 42,
+     "msg": "order placed", "fields": {"request": "abc", "order": 42}, "exc": "..."}
+
+`time` is the epoch in seconds with microseconds, `fields` and `exc` are only present
+when the record has key-value fields (see filters.ContextFilter) or exception / stack text.
+"""
+
+_LEVELS = dict(
+    (levelno, encode_basestring(name)) for levelno, name in GlogColorFormatter.LEVEL_MAP.items()
+)
+
+
+def encode_value(value):
+    """JSON text of a field value, plain values without going through json.dumps"""
+    value_type = type(value)
+    if value_type is str:
+        return encode_basestring(value)
+    if value is None:
+        return "null"
+    if value_type is bool:
+        return "true" if value else "false"
+    if value_type is int:
+        return int.__repr__(value)
+    if value_type is float and value == value and value not in (float("inf"), float("-inf")):
+        return float.__repr__(value)
+    return json.dumps(value, default=str, ensure_ascii=True)
+
+
+def encode_fields(fields):
+    return "{%s}" % ",".join(
+        [
+            "%s:%s" % (encode_basestring(str(key)), encode_value(value))
+            for key, value in fields.items()
+        ]
+    )
+
+
+class JsonFormatter(logging.Formatter):
+    """format records as single-line JSON objects
+
+    The record layout is fixed, so the object is assembled from pre-encoded pieces:
+    level names and filenames are encoded once and cached, strings go through the
+    C accelerated `encode_basestring`.
+    """
+
+    def __init__(self):
+        logging.Formatter.__init__(self)
+        self._files = {}
+
+    def format(self, record):
+        filename = record.filename
+        file_json = self._files.get(filename)
+        if file_json is None:
+            file_json = self._files[filename] = encode_basestring(filename)
+        level_json = _LEVELS.get(record.levelno)
+        if level_json is None:
+            level_json = encode_basestring(logging.getLevelName(record.levelno).lower())
+
+        created = record.created
+        seconds = int(created)
+        # 微秒与文本格式的前缀一致（截断而不是四舍五入）
+        parts = [
+            '{"time":%d.%06d,"level":%s,"file":%s,"line":%d,"msg":%s'
+            % (
+                seconds,
+                int((created - seconds) * 1e6),
+                level_json,
+                file_json,
+                record.lineno,
+                encode_basestring(str(format_message(record))),
+            )
+        ]
+        fields = record.__dict__.get("wcs_fields")
+        if fields:
+            parts.append(',"fields":')
+            parts.append(encode_fields(fields))
+        text = format_traceback(record)
+        if text:
+            parts.append(',"exc":')
+            parts.append(encode_basestring(text))
+        parts.append("}")
+        return "".join(parts)
+
+
+def load_line(line):
+    """decode one line written by JsonFormatter"""
+    return json.loads(line)
@@ -0,0 +1,255 @@
+"""
+Copyright (c) Min.Wu - All Rights Reserved
+Unauthorized copying of this file, via any medium is strictly prohibited
+Proprietary and confidential
+Author: Min.Wu <wumin@126.com>, 2026/01/07
+"""
+
+import multiprocessing
+import re
+
+from wcs_utils.logger.parser import PREFIX_PATTERN, iter_records, open_log, scan, split_chunks
+
+"""Drain-style template mining of log messages
+
+Drain clusters messages in a fixed-depth parse tree: token count, then the leading
+tokens, then a similarity search among the few templates of the leaf. Our prefix
+already carries the call site, so the tree here is `filename:line` -> token count ->
+templates, and a site almost always holds a single template. Tokens containing a digit
+are replaced by `<*>` before anything else, and messages whose masked text was seen
+before are resolved with one dict lookup, so the similarity search only runs for new
+shapes of a message.
+
+Only the first line of a record is mined, tracebacks are left out. Times are the
+prefix text "YYYY-MM-DD HH:MM:SS.ffffff", which sorts like the time itself.
+"""
+
+MASK = b"<*>"
+# 与 Drain 的预处理一样，含数字的 token 直接当作参数
+# 从 token 开头匹配，避免在每个单词里回溯
+_NUMERIC_TOKEN = re.compile(rb"(?<!\S)[^\s\d]*\d\S*")
+# 前缀 "[" 之后固定宽度的时间
+_TIME_WIDTH = len("YYYY-MM-DD HH:MM:SS.ffffff")
+
+
+class Template(object):
+    """one cluster of a call site: template tokens, count, first / last time and example
+    messages, whose arguments (the tokens at the `<*>` positions) are only cut out of them
+    by the final template"""
+
+    __slots__ = ("filename", "line", "tokens", "count", "first", "last", "examples")
+
+    def __init__(self, filename, line, tokens, stamp):
+        self.filename = filename
+        self.line = line
+        self.tokens = list(tokens)
+        self.count = 0
+        self.first = stamp
+        self.last = stamp
+        self.examples = []
+
+    def similarity(self, tokens):
+        """(share of tokens equal to the template or at a `<*>`, number of `<*>`)"""
+        same = wildcards = 0
+        for mine, token in zip(self.tokens, tokens):
+            if mine == MASK:
+                wildcards += 1
+            elif mine == token:
+                same += 1
+        return float(same + wildcards) / len(tokens), wildcards
+
+    def absorb(self, tokens):
+        """turn the positions where tokens differ from the template into `<*>`"""
+        for i, (mine, token) in enumerate(zip(self.tokens, tokens)):
+            if mine != token and mine != MASK:
+                self.tokens[i] = MASK
+
+    def arguments(self, message):
+        return [token for mine, token in zip(self.tokens, message.split()) if mine == MASK]
+
+    @property
+    def site(self):
+        return "%s:%s" % (self.filename.decode(), self.line.decode())
+
+    @property
+    def text(self):
+        return b" ".join(self.tokens).decode("utf-8", "replace")
+
+    def to_dict(self):
+        examples = []
+        for message in self.examples:
+            args = [arg.decode("utf-8", "replace") for arg in self.arguments(message)]
+            # 没有参数的模板不需要例子
+            if args and args not in examples:
+                examples.append(args)
+        return {
+            "site": self.site,
+            "template": self.text,
+            "count": self.count,
+            "first": self.first.decode(),
+            "last": self.last.decode(),
+            "examples": examples,
+        }
+
+
+class TemplateMiner(object):
+    """streaming template miner, feed it with `add()` / `add_records()`
+
+    Args:
+        similarity(float): min share of matching tokens to join a template (default: 0.4)
+        examples(int): example messages kept per template (default: 3)
+        max_children(int): templates per site and token count, further messages join
+            the most similar one (default: 100)
+        cache_size(int): masked messages remembered for the dict fast path
+    """
+
+    def __init__(self, similarity=0.4, examples=3, max_children=100, cache_size=1 << 20):
+        self.similarity = similarity
+        self.max_examples = examples
+        self.max_children = max_children
+        self.cache_size = cache_size
+        self.records = 0
+        # (filename, line, token 数) -> [Template]
+        self._leaves = {}
+        # (filename, line, 屏蔽数字后的消息) -> Template
+        self._cache = {}
+
+    def _match(self, filename, line, tokens, stamp):
+        leaf_key = (filename, line, len(tokens))
+        leaf = self._leaves.get(leaf_key)
+        if leaf is None:
+            leaf = self._leaves[leaf_key] = []
+        best = best_score = None
+        if tokens:
+            for template in leaf:
+                score = template.similarity(tokens)
+                if best_score is None or score > best_score:
+                    best, best_score = template, score
+        elif leaf:
+            best, best_score = leaf[0], (1.0, 0)
+        if best is not None and (
+            best_score[0] >= self.similarity or len(leaf) >= self.max_children
+        ):
+            best.absorb(tokens)
+            return best
+        template = Template(filename, line, tokens, stamp)
+        leaf.append(template)
+        return template
+
+    def add(self, filename, line, stamp, message):
+        """add one message (bytes) logged at `filename:line` at prefix time `stamp`"""
+        masked = _NUMERIC_TOKEN.sub(MASK, message)
+        key = (filename, line, masked)
+        template = self._cache.get(key)
+        if template is None:
+            template = self._match(filename, line, masked.split(), stamp)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[key] = template
+        template.count += 1
+        if stamp < template.first:
+            template.first = stamp
+        elif stamp > template.last:
+            template.last = stamp
+        if len(template.examples) < self.max_examples and message not in template.examples:
+            template.examples.append(message)
+        self.records += 1
+        return template
+
+    def add_records(self, buf, records):
+        """add the (match, record_end) pairs of buf, as yielded by parser.iter_records or
+        parser.scan"""
+        add = self.add
+        find = buf.find
+        for match, end in records:
+            start = match.end()
+            newline = find(b"\n", start, end)
+            prefix = match.start() + 1
+            filename, line = match.group("filename", "line")
+            add(
+                filename,
+                line,
+                buf[prefix: prefix + _TIME_WIDTH],
+                buf[start: newline if newline >= 0 else end],
+            )
+
+    def add_record(self, record):
+        """add one record (bytes starting with its prefix), e.g. from LogFollower.poll()"""
+        match = PREFIX_PATTERN.match(record)
+        if match is not None:
+            self.add_records(record, [(match, len(record))])
+
+    def merge(self, other):
+        """fold the templates of another miner (e.g. of another chunk) into this one"""
+        for template in other.templates():
+            mine = self._match(template.filename, template.line, template.tokens, template.first)
+            mine.count += template.count
+            mine.first = min(mine.first, template.first)
+            mine.last = max(mine.last, template.last)
+            for message in template.examples:
+                if len(mine.examples) >= self.max_examples:
+                    break
+                if message not in mine.examples:
+                    mine.examples.append(message)
+        self.records += other.records
+        return self
+
+    def templates(self, top=None):
+        """templates by count, most frequent first"""
+        result = sorted(
+            (t for leaf in self._leaves.values() for t in leaf if t.count),
+            key=lambda t: (-t.count, t.filename, int(t.line)),
+        )
+        return result if top is None else result[:top]
+
+    def __getstate__(self):
+        # 缓存只对本进程有用，不传回主进程
+        state = dict(self.__dict__)
+        state["_cache"] = {}
+        return state
+
+
+def mine_chunk(chunk, query=None, similarity=0.4, examples=3):
+    """mine the records of one (path, start, end) chunk"""
+    path, start, end = chunk
+    miner = TemplateMiner(similarity=similarity, examples=examples)
+    with open_log(path) as buf:
+        if query is None:
+            records = iter_records(buf, start, end)
+        else:
+            records = scan(buf, query, start, end)
+        miner.add_records(buf, records)
+    return miner
+
+
+def _mine_chunk_star(args):
+    return mine_chunk(*args)
+
+
+def mine_files(paths, query=None, jobs=None, chunk_size=64 * 1024 * 1024, similarity=0.4,
+               examples=3):
+    """mine many log files on a process pool, one task per record-aligned chunk
+
+    Like parser.scan_files, workers map their chunk themselves and only send back
+    their templates, which are merged here.
+    """
+    chunks = []
+    for path in paths:
+        chunks.extend(split_chunks(path, chunk_size))
+    total = TemplateMiner(similarity=similarity, examples=examples)
+    if not chunks:
+        return total
+    jobs = min(jobs or multiprocessing.cpu_count(), len(chunks))
+    tasks = [(chunk, query, similarity, examples) for chunk in chunks]
+    if jobs <= 1:
+        for task in tasks:
+            total.merge(_mine_chunk_star(task))
+        return total
+    pool = multiprocessing.Pool(jobs)
+    try:
+        for miner in pool.imap_unordered(_mine_chunk_star, tasks):
+            total.merge(miner)
+    finally:
+        pool.close()
+        pool.join()
+    return total
@@ -0,0 +1,128 @@
+/*
+ * Copyright (c) Min.Wu - All Rights Reserved
+ * Unauthorized copying of this file, via any medium is strictly prohibited
+ * Proprietary and confidential
+ * Author: Min.Wu <wumin@126.com>, 2026/01/07
+ */
+
+#include "log/log_bridge.h"
+
+#include <spdlog/spdlog.h>
+
+#include <exception>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <unordered_set>
+
+#include "log/logging.h"
+
+namespace {
+
+/// @brief wcs_log_init 创建的 helper，C++ 自己初始化的 g_wheel_logger 不归这里管
+std::unique_ptr<common::SpdlogHelper> g_bridge_helper;
+std::mutex g_bridge_mutex;
+
+/// @brief 调用方持有 g_bridge_mutex；正在写的线程（包括 WCS_LOG_* 宏）
+///        持有 logger 的 shared_ptr，不会悬空
+void ReleaseBridgeHelper() {
+  if (!g_bridge_helper) {
+    return;
+  }
+  // 只有 g_wheel_logger 还是这里创建的 logger 时才清空
+  auto expected = g_bridge_helper->GetLogger();
+  std::atomic_compare_exchange_strong(
+      &common::g_wheel_logger, &expected,
+      std::shared_ptr<spdlog::logger>(nullptr));
+  g_bridge_helper.reset();
+}
+
+/// @brief source_loc 只保存文件名指针，异步 logger 在后台线程才格式化，
+///        所以文件名复制一份，进程结束前不释放
+const char* InternFilename(const char* filename) {
+  // 每个线程先查自己的缓存，避免每条记录都加锁
+  thread_local std::unordered_map<std::string, const char*> local_names;
+  std::string name(filename);
+  auto found = local_names.find(name);
+  if (found != local_names.end()) {
+    return found->second;
+  }
+
+  static std::mutex names_mutex;
+  static std::unordered_set<std::string> names;
+  const char* interned = nullptr;
+  {
+    std::lock_guard<std::mutex> lock(names_mutex);
+    interned = names.insert(name).first->c_str();
+  }
+  local_names.emplace(std::move(name), interned);
+  return interned;
+}
+
+}  // namespace
+
+extern "C" {
+
+int wcs_log_init(const char* log_dir, const char* log_file_name,
+                 size_t max_file_size_mb, size_t max_log_files,
+                 size_t async_queue_size) {
+  std::lock_guard<std::mutex> lock(g_bridge_mutex);
+  // 先释放之前创建的，同名 logger 不能重复注册
+  ReleaseBridgeHelper();
+  try {
+    auto helper = std::make_unique<common::SpdlogHelper>(max_file_size_mb,
+                                                         max_log_files);
+    if (async_queue_size > 0) {
+      helper->EnableAsync(async_queue_size);
+    }
+    helper->SetLogPath(log_dir, log_file_name);
+    common::InitializeWheelLogger(helper.get());
+    g_bridge_helper = std::move(helper);
+  } catch (const std::exception& e) {
+    spdlog::error("wcs_log_init failed: {}", e.what());
+    return -1;
+  }
+  return 0;
+}
+
+int wcs_log_is_initialized(void) { return common::GetWheelLogger() != nullptr; }
+
+int wcs_log_should_log(int level) {
+  auto logger = common::GetWheelLogger();
+  return logger &&
+         logger->should_log(static_cast<spdlog::level::level_enum>(level));
+}
+
+int wcs_log_record(int level, const char* filename, int line, const char* msg,
+                   size_t len) {
+  auto logger = common::GetWheelLogger();
+  if (!logger) {
+    return -1;
+  }
+  auto lvl = static_cast<spdlog::level::level_enum>(level);
+  if (!logger->should_log(lvl)) {
+    return 0;
+  }
+  try {
+    spdlog::source_loc loc{InternFilename(filename ? filename : ""), line, ""};
+    logger->log(loc, lvl, spdlog::string_view_t(msg, len));
+  } catch (const std::exception&) {
+    return -1;
+  }
+  return 0;
+}
+
+void wcs_log_flush(void) {
+  auto logger = common::GetWheelLogger();
+  if (logger) {
+    logger->flush();
+  }
+}
+
+void wcs_log_shutdown(void) {
+  std::lock_guard<std::mutex> lock(g_bridge_mutex);
+  ReleaseBridgeHelper();
+}
+
+}  // extern "C"
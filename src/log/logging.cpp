@@ -8,6 +8,7 @@
 #include "log/logging.h"
 
 #include <spdlog/spdlog.h>
+#include <spdlog/async.h>
 #include <spdlog/sinks/stdout_color_sinks.h>
 #include <spdlog/sinks/rotating_file_sink.h>
 
@@ -75,14 +76,24 @@ void SpdlogHelper::SetLogPath(const std::filesystem::path& log_dir,
   file_sink->set_level(spdlog::level::info);
   file_sink->set_pattern("[%Y-%m-%d %H:%M:%S.%f %s:%# %t %l] %v");
 
-  logger_ = std::make_shared<spdlog::logger>(
-      log_file_name, spdlog::sinks_init_list{console_sink, file_sink});
+  if (async_queue_size_ > 0) {
+    if (!thread_pool_) {
+      thread_pool_ = std::make_shared<spdlog::details::thread_pool>(
+          async_queue_size_, async_thread_count_);
+    }
+    logger_ = std::make_shared<spdlog::async_logger>(
+        log_file_name, spdlog::sinks_init_list{console_sink, file_sink},
+        thread_pool_, spdlog::async_overflow_policy::block);
+  } else {
+    logger_ = std::make_shared<spdlog::logger>(
+        log_file_name, spdlog::sinks_init_list{console_sink, file_sink});
+  }
   logger_->set_level(spdlog::level::info);
 
   // 设置刷新策略
   logger_->flush_on(spdlog::level::info);  // info 以上立即刷新
-  spdlog::flush_every(
-      std::chrono::milliseconds(1000));  // 低于info的，1000ms 刷新一次
+  // 低于info的，1s 刷新一次；旧版本 spdlog 的 flush_every 只接受 seconds
+  spdlog::flush_every(std::chrono::seconds(1));
 
   spdlog::register_logger(logger_);
 }
@@ -91,6 +102,11 @@ std::shared_ptr<spdlog::logger> SpdlogHelper::GetLogger() const {
   return logger_;
 }
 
+void SpdlogHelper::EnableAsync(size_t queue_size, size_t thread_count) {
+  async_queue_size_ = queue_size;
+  async_thread_count_ = thread_count;
+}
+
 std::string SpdlogHelper::GenerateLogFilename(
     const std::filesystem::path& log_dir, const std::string& log_file_name) {
   // 获取当前时刻（包括微秒）
@@ -143,7 +159,8 @@ std::filesystem::path SpdlogHelper::ExpandPath(std::filesystem::path path) {
 
 void InitializeWheelLogger(SpdlogHelper* helper) {
   if (helper) {
-    g_wheel_logger = helper->GetLogger();
+    // log_bridge.cpp 在其他线程里用 atomic_load 读取
+    std::atomic_store(&g_wheel_logger, helper->GetLogger());
   }
 }
 